@@ -0,0 +1,91 @@
+import streamlit as st
+
+from llm_client import get_api_key
+from pipeline import STRATEGY_LABELS, cancel_all, start_all
+from prompt_saver import add_prompt
+from result_view import show_rows, wait_with_cancel
+from schema_catalog import fetch_schema_prompt
+from sql_cache import lookup_sql, store_sql
+from summary_jobs import start_summary, summaries_enabled, summary_panel
+
+def show_result(sql_query, result, key):
+    if isinstance(result, str):
+        st.error(result)
+    elif result.empty:
+        st.warning("No results found.")
+    else:
+        show_rows(sql_query, result, key)
+
+
+def all_strategies_app(title, pipelines, key):
+    """Run one question through all prompting strategies of a page at once.
+
+    The SQL of all strategies is generated, repaired and started at once with
+    start_all, and the results are shown once every call has answered. They
+    are summarized in the background after they are shown.
+    """
+    st.text("-------------------------------------------------------------------------------")
+    st.subheader("All strategies: Convert natural language to SQL queries with every prompting strategy at once")
+
+    query = st.text_area('Enter your text to generate SQL queries', '', key=f'{key}_all_query')
+    if not st.button('Generate with all strategies', key=f'{key}_all_generate') or len(query) == 0:
+        return
+
+    apps = {pipeline.category: pipeline for pipeline in pipelines}
+    api_keys = {category: get_api_key(app.provider) for category, app in apps.items()}
+    sections = {}
+    entries = {}
+    jobs = {}
+    schema_info_str = None
+
+    for category, app in apps.items():
+        sections[category] = st.container()
+        with sections[category]:
+            st.subheader(f"{title} {STRATEGY_LABELS[app.strategy]}: Query Results")
+            if not api_keys[category]:
+                st.error("API key not found. Please set it in the .env file.")
+                continue
+            sql_query = lookup_sql(app.model, app.strategy, query)
+        if sql_query is not None:
+            jobs[category] = {"pipeline": app, "sql_query": sql_query}
+            continue
+        if schema_info_str is None:
+            schema_info_str = fetch_schema_prompt(query) or ""
+        if not schema_info_str:
+            # The schema could not be read and the error is already shown
+            continue
+        jobs[category] = {"pipeline": app, "api_key": api_keys[category],
+                          "request": app.sql_request(query, schema_info_str)}
+
+    with st.spinner("Generating SQL queries..."):
+        runs = start_all(jobs, sections)
+
+    try:
+        for category, run in runs.items():
+            if run["query"] is None:
+                continue
+            app = apps[category]
+            with sections[category]:
+                st.write("Generated SQL Query:")
+                st.code(run["sql_query"], language='sql')
+                result = wait_with_cancel(run["query"], f"{key}_{category}")
+                if run["generated"] and not isinstance(result, str):
+                    store_sql(app.model, app.strategy, query, run["sql_query"])
+                show_result(run["sql_query"], result, f"{key}_{category}")
+            entries[category] = {"prompt": query, "sql_query": run["sql_query"], "results": result}
+    finally:
+        # A rerun stops the script while waiting; the queries of the other strategies are stopped too
+        cancel_all(runs)
+
+    # Summaries are generated in the background and fill in once ready, the results are shown right away
+    summaries = {}
+    for category, entry in entries.items():
+        app = apps[category]
+        prompt_id = add_prompt(category, entry)
+        if summaries_enabled(app.model, app.summarize) and not isinstance(entry["results"], str) and not entry["results"].empty:
+            summaries[category] = start_summary(app.provider, api_keys[category], app.summary_request(entry["results"]), prompt_id)
+    # Every summary is started before waiting for the first one
+    for category, summary_key in summaries.items():
+        with sections[category]:
+            st.subheader(f"{title} {STRATEGY_LABELS[apps[category].strategy]}: Summary of Results")
+            summary_panel(summary_key)
@@ -0,0 +1,157 @@
+"""Run a file of questions through one app's pipeline without Streamlit and write the outcome to Parquet.
+
+    python batch_eval.py questions.jsonl --app gpt3_zero_shot --output results.parquet
+    python batch_eval.py questions.jsonl --app llama_one_shot --base-url http://localhost:8000 --concurrency 32
+
+Each line of the questions file is a JSON object with a "question" (or
+"prompt", as in prompts.json) and an optional "id". Every question goes
+through the same steps as on the app's page: the schema is pruned for the
+question, the model generates SQL, SQL that does not bind is sent back to the
+model once, and the query is executed on the DuckDB database. The SQL cache
+and the prompt history are left untouched. One row per question is written
+with the SQL, the seconds each step took, the row count and any error.
+
+Run it from the directory holding the .env file and the database, like the app.
+"""
+import argparse
+import importlib
+import json
+import statistics
+import sys
+import time
+
+import pandas as pd
+from streamlit.logger import set_log_level
+
+from llm_client import LLM_CONCURRENCY, LLM_TIMEOUT, get_api_key, use_base_url
+from pipeline import cancel_all, start_all
+from result_cache import QUERY_TIMEOUT, RESULT_ROW_LIMIT
+from schema_catalog import SCHEMA_TOKEN_BUDGET, SCHEMA_TOP_K, get_schema_catalog
+
+# Modules of the apps that can be run, by the name given on the command line
+APP_MODULES = {
+    "gpt3_zero_shot": "GPT.gpt3_zero_shot", "gpt3_one_shot": "GPT.gpt3_one_shot", "gpt3_few_shot": "GPT.gpt3_few_shot",
+    "gpt4_zero_shot": "GPT.gpt4_zero_shot", "gpt4_one_shot": "GPT.gpt4_one_shot", "gpt4_few_shot": "GPT.gpt4_few_shot",
+    "llama_zero_shot": "Llama.llama_zero_shot", "llama_one_shot": "Llama.llama_one_shot",
+}
+
+
+def read_questions(path):
+    """Read the questions file, numbering the questions that have no id.
+
+    Ids must be unique, since the records of the questions are keyed by them.
+    """
+    questions = []
+    lines = {}
+    with open(path, 'r') as f:
+        for number, line in enumerate(f):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            question = item.get("question") or item.get("prompt")
+            if not question:
+                raise ValueError(f"Line {number + 1} of {path} has no question")
+            question_id = str(item.get("id", number))
+            if question_id in lines:
+                raise ValueError(f"Line {number + 1} of {path} repeats the id {question_id} of line {lines[question_id]}")
+            lines[question_id] = number + 1
+            questions.append({"id": question_id, "question": question})
+    return questions
+
+
+def run_batch(pipeline, api_key, questions, concurrency=LLM_CONCURRENCY, top_k=SCHEMA_TOP_K,
+              token_budget=SCHEMA_TOKEN_BUDGET, repair=True, max_rows=RESULT_ROW_LIMIT, timeout=QUERY_TIMEOUT,
+              llm_timeout=LLM_TIMEOUT):
+    """Answer every question with a pipeline and return one record per question, in the order of the questions.
+
+    The questions go through start_all like the strategies of a page: SQL
+    generations are sent `concurrency` at a time and each query is executed
+    in the query workers as soon as its SQL is known.
+    """
+    catalog = get_schema_catalog()
+    jobs = {item["id"]: {"pipeline": pipeline, "api_key": api_key,
+                         "request": pipeline.sql_request(item["question"],
+                                                         catalog.pruned_prompt(item["question"], top_k, token_budget))}
+            for item in questions}
+    runs = start_all(jobs, repair=repair, max_rows=max_rows, timeout=timeout, llm_timeout=llm_timeout,
+                     concurrency=concurrency)
+    records = []
+    try:
+        for item in questions:
+            run = runs[item["id"]]
+            record = {"id": item["id"], "question": item["question"], "model": pipeline.model,
+                      "strategy": pipeline.strategy, "sql_query": run["sql_query"],
+                      "generation_seconds": run["generation_seconds"], "bind_error": run["bind_error"],
+                      "repaired": run["repaired"], "repair_seconds": run["repair_seconds"],
+                      "execution_seconds": None, "rows": None, "truncated": None, "error": run["error"]}
+            if run["query"] is not None:
+                future, running = run["query"]
+                result = future.result()
+                record["execution_seconds"] = running["seconds"]
+                if isinstance(result, str):
+                    record["error"] = result
+                else:
+                    record.update(rows=len(result), truncated=result.attrs.get("truncated"))
+            records.append(record)
+    finally:
+        # An interrupted run does not leave queries behind in the workers
+        cancel_all(runs)
+    return records
+
+
+def describe(records, seconds):
+    """Summarize a batch run in a few lines for the terminal."""
+    def median(column):
+        values = [record[column] for record in records if record[column] is not None]
+        return f"{statistics.median(values):.2f} s" if values else "n/a"
+    errors = sum(1 for record in records if record["error"])
+    repaired = sum(1 for record in records if record["repaired"])
+    return "\n".join([
+        f"{len(records)} questions in {seconds:.1f} s ({len(records) / seconds:.1f} questions/s)",
+        f"{errors} errors, {repaired} queries repaired",
+        f"median generation {median('generation_seconds')}, median execution {median('execution_seconds')}",
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("questions", help="JSONL file with one question per line")
+    parser.add_argument("--app", choices=sorted(APP_MODULES), required=True, help="model and prompting strategy")
+    parser.add_argument("--output", default="batch_results.parquet")
+    parser.add_argument("--base-url", help="server to send model calls to instead of the real API, e.g. a local stand-in")
+    parser.add_argument("--api-key", help="API key to use instead of the one in the .env file")
+    parser.add_argument("--concurrency", type=int, default=LLM_CONCURRENCY, help="model calls in flight at once")
+    parser.add_argument("--top-k", type=int, default=SCHEMA_TOP_K, help="tables sent to the model (0 = all)")
+    parser.add_argument("--token-budget", type=int, default=SCHEMA_TOKEN_BUDGET, help="schema token budget")
+    parser.add_argument("--max-rows", type=int, default=RESULT_ROW_LIMIT, help="rows read from each result")
+    parser.add_argument("--timeout", type=float, default=QUERY_TIMEOUT, help="seconds a query may run")
+    parser.add_argument("--llm-timeout", type=float, default=LLM_TIMEOUT, help="seconds a model call may take")
+    parser.add_argument("--no-repair", action="store_true", help="do not send SQL that does not bind back to the model")
+    args = parser.parse_args()
+
+    # Streamlit's caches work without a running app, but warn about it on every use
+    set_log_level("error")
+    if args.base_url:
+        use_base_url(args.base_url)
+    pipeline = importlib.import_module(APP_MODULES[args.app]).PIPELINE
+    # A local stand-in accepts any key
+    api_key = args.api_key or get_api_key(pipeline.provider) or ("local" if args.base_url else None)
+    if not api_key:
+        sys.exit("API key not found. Please set it in the .env file or pass --api-key.")
+
+    try:
+        questions = read_questions(args.questions)
+    except ValueError as e:
+        sys.exit(str(e))
+    start = time.perf_counter()
+    records = run_batch(pipeline, api_key, questions, concurrency=args.concurrency,
+                        top_k=args.top_k, token_budget=args.token_budget, repair=not args.no_repair,
+                        max_rows=args.max_rows, timeout=args.timeout, llm_timeout=args.llm_timeout)
+    seconds = time.perf_counter() - start
+    pd.DataFrame(records).to_parquet(args.output, index=False)
+    print(describe(records, seconds))
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
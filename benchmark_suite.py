@@ -0,0 +1,255 @@
+"""Time every stage of the app, from a cold start to rendering the Saved Prompts page, and compare runs.
+
+    python benchmark_suite.py --output bench.json
+    python benchmark_suite.py --output bench.json --compare baseline.json --threshold 0.2
+
+Model calls go to the local stand-in of mock_llm.py, so no API keys or network
+are needed, and the prompt history and caches are written to a temporary
+directory. The database is isrecon_all.duckdb in the current directory or the
+one given with --database, or a synthetic one of the size given with --scale
+(see generate_database.py). The results are written as JSON with the median,
+minimum and maximum seconds of every benchmark. With --compare, medians that
+got slower than the baseline by more than the threshold are reported and the
+exit status is 1.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from streamlit.logger import set_log_level
+from streamlit.testing.v1 import AppTest
+
+import db_connection
+from cold_start_benchmark import run_once
+from generate_database import generate
+from llm_client import complete_all, get_client, use_base_url
+from mock_llm import load_canned, start_server
+from prompt_saver import CATEGORIES, PROMPTS_FILE, PromptHistory
+from result_cache import execute_sql, fetch_bounded, get_result_cache
+from schema_catalog import _build_catalog, get_schema_catalog
+from sql_repair import validate_sql
+
+# Apps whose prompts are built in the prompt construction benchmark
+BENCHMARK_APPS = ["GPT.gpt3_zero_shot", "GPT.gpt3_one_shot", "GPT.gpt3_few_shot", "Llama.llama_zero_shot"]
+
+# Questions and SQL used when prompts.json has none
+DEFAULT_CANNED = [
+    {"prompt": "show me the total articles by journal",
+     "sql_query": "SELECT journal, COUNT(article_id) AS total_articles FROM papers GROUP BY journal"},
+    {"prompt": "which entities are mentioned most often",
+     "sql_query": "SELECT entity, COUNT(*) AS mentions FROM entities GROUP BY entity ORDER BY mentions DESC LIMIT 20"},
+    {"prompt": "how many sentences does each paper have",
+     "sql_query": "SELECT p.title, COUNT(*) AS sentences FROM papers p JOIN sentences s ON p.article_id = s.article_id "
+                  "GROUP BY p.title ORDER BY sentences DESC"},
+]
+
+# Entries in the prompt history when the Saved Prompts page is rendered
+BENCHMARK_HISTORY_ENTRIES = 200
+
+# Medians that differ from the baseline by less than this many seconds are never reported as regressions
+MIN_REGRESSION_SECONDS = 0.001
+
+
+def timed(function, repeat):
+    """Call a function repeatedly and return the seconds each call took."""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def bench_cold_start(context, repeat):
+    return [run_once("Home Page", False)["seconds"] for _ in range(min(repeat, 3))]
+
+
+def bench_schema_fetch(context, repeat):
+    def fetch():
+        _build_catalog.clear()
+        get_schema_catalog()
+    return timed(fetch, repeat)
+
+
+def bench_schema_pruning(context, repeat):
+    catalog = get_schema_catalog()
+    return timed(lambda: [catalog.pruned_prompt(item["prompt"]) for item in context["canned"]], repeat)
+
+
+def bench_prompt_construction(context, repeat):
+    catalog = get_schema_catalog()
+    pipelines = [importlib.import_module(name).PIPELINE for name in BENCHMARK_APPS]
+    return timed(lambda: [pipeline.sql_request(item["prompt"], catalog.pruned_prompt(item["prompt"]))
+                          for pipeline in pipelines for item in context["canned"]], repeat)
+
+
+def bench_llm_round_trip(context, repeat):
+    client = get_client("openai", "benchmark")
+    request = {"model": "gpt-3.5-turbo", "stream": True, "stop": ["#", ";"],
+               "messages": [{"role": "user", "content": f"Generate a SQL query to {context['canned'][0]['prompt']}"}]}
+
+    def round_trip():
+        for _ in client.chat.completions.create(**request):
+            pass
+    return timed(round_trip, repeat)
+
+
+def bench_llm_concurrent(context, repeat):
+    jobs = {str(i): ("groq", "benchmark", {"model": "llama3-70b-8192", "messages": [
+        {"role": "user", "content": f"Generate a SQL query to {item['prompt']} ({i})"}]})
+        for i, item in enumerate(context["canned"] * 8)}
+    return timed(lambda: complete_all(jobs, concurrency=8), repeat)
+
+
+def bench_sql_validation(context, repeat):
+    return timed(lambda: [validate_sql(item["sql_query"]) for item in context["canned"]], repeat)
+
+
+def bench_sql_execution(context, repeat):
+    # Read straight from the database, past the result cache
+    return timed(lambda: [fetch_bounded(item["sql_query"]) for item in context["canned"]], repeat)
+
+
+def bench_sql_execution_cached(context, repeat):
+    get_result_cache()
+    return timed(lambda: [execute_sql(item["sql_query"]) for item in context["canned"]], repeat)
+
+
+def bench_history_save(context, repeat):
+    results = [execute_sql(item["sql_query"]) for item in context["canned"]]
+    history = PromptHistory(os.path.join(context["workdir"], "save_benchmark.sqlite"))
+    return timed(lambda: [history.add(CATEGORIES[0], {"prompt": item["prompt"], "sql_query": item["sql_query"],
+                                                      "results": result, "created_at": time.time()})
+                          for item, result in zip(context["canned"], results)], repeat)
+
+
+def bench_prompts_page(context, repeat):
+    # The page reads the history of the working directory, filled here once
+    history = PromptHistory()
+    result = pd.DataFrame({"journal": [f"Journal {i}" for i in range(50)], "total_articles": range(50)})
+    for i in range(BENCHMARK_HISTORY_ENTRIES - history.count(CATEGORIES[0])):
+        history.add(CATEGORIES[0], {"prompt": f"question {i}", "sql_query": "SELECT 1", "results": result,
+                                    "summary": "A summary.", "created_at": time.time()})
+
+    def render():
+        app = AppTest.from_string("from prompt_saver import prompts_page\nprompts_page()", default_timeout=120)
+        app.run()
+        if app.exception:
+            raise RuntimeError(app.exception[0].value)
+    return timed(render, repeat)
+
+
+# Benchmarks in the order they run, by the name used in the results
+BENCHMARKS = {
+    "cold_start": bench_cold_start,
+    "schema_fetch": bench_schema_fetch,
+    "schema_pruning": bench_schema_pruning,
+    "prompt_construction": bench_prompt_construction,
+    "llm_round_trip": bench_llm_round_trip,
+    "llm_concurrent": bench_llm_concurrent,
+    "sql_validation": bench_sql_validation,
+    "sql_execution": bench_sql_execution,
+    "sql_execution_cached": bench_sql_execution_cached,
+    "history_save": bench_history_save,
+    "prompts_page": bench_prompts_page,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(names, repeat, database, llm_profile):
+    """Run the chosen benchmarks in a temporary working directory and return their timings."""
+    canned = load_canned(os.path.abspath(PROMPTS_FILE), history_file="") or DEFAULT_CANNED
+    os.environ["DATABASE_FILE"] = db_connection.DATABASE_FILE = database
+    server, base_url = start_server(profile=llm_profile)
+    use_base_url(base_url)
+    previous = os.getcwd()
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            os.chdir(workdir)
+            try:
+                context = {"canned": canned, "workdir": workdir}
+                for name in names:
+                    seconds = BENCHMARKS[name](context, repeat)
+                    results[name] = {"runs": len(seconds), "median": statistics.median(seconds),
+                                     "min": min(seconds), "max": max(seconds)}
+                    print(f"{name:<22} median {results[name]['median']:.4f} s  min {results[name]['min']:.4f} s")
+            finally:
+                os.chdir(previous)
+    finally:
+        server.shutdown()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the change of every median against the baseline and return the names that got slower."""
+    regressions = []
+    print(f"\n{'Benchmark':<22} {'Baseline (s)':>12} {'Current (s)':>12} {'Change':>8}")
+    for name, result in results.items():
+        if name not in baseline["benchmarks"]:
+            continue
+        before = baseline["benchmarks"][name]["median"]
+        change = result["median"] / before - 1 if before else 0
+        slower = change > threshold and result["median"] - before > MIN_REGRESSION_SECONDS
+        if slower:
+            regressions.append(name)
+        print(f"{name:<22} {before:>12.4f} {result['median']:>12.4f} {change:>+7.0%}{'  slower' if slower else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="bench.json", help="file the results are written to")
+    parser.add_argument("--compare", help="results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown reported as a regression (0.2 = 20%%)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each benchmark")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="benchmarks to run (default: all)")
+    parser.add_argument("--database", default=db_connection.DATABASE_FILE, help="DuckDB database to query")
+    parser.add_argument("--scale", type=float, help="benchmark a synthetic database of this scale factor instead")
+    parser.add_argument("--llm-profile", default="instant", help="latency profile of the local model stand-in")
+    args = parser.parse_args()
+
+    # Streamlit's caches work without a running app, but warn about it on every use
+    set_log_level("error")
+    with tempfile.TemporaryDirectory() as datadir:
+        if args.scale:
+            database = os.path.join(datadir, "isrecon_synthetic.duckdb")
+            generate(database, args.scale)
+        elif os.path.exists(args.database):
+            database = os.path.abspath(args.database)
+        else:
+            sys.exit(f"Database {args.database} not found.")
+        results = run_suite(args.only or list(BENCHMARKS), args.repeat, database, args.llm_profile)
+        report = {"commit": git_commit(), "created_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+                  "python": platform.python_version(), "database": None if args.scale else database,
+                  "scale": args.scale, "database_bytes": os.path.getsize(database), "llm_profile": args.llm_profile,
+                  "benchmarks": results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            sys.exit(f"Slower than {args.compare}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
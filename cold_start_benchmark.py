@@ -0,0 +1,69 @@
+"""Measure how long a fresh process takes to render a page of the app.
+
+Each run starts a new Python process that renders main.py with Streamlit's
+app tester and reports the seconds until the page is rendered and the number
+of modules loaded. The lazy runs use main.py as it is; the eager runs import
+every page module first, as main.py did when it imported them all at the top.
+
+    python cold_start_benchmark.py --pages "Home Page" "GPT 3.5" --repeat 5
+
+Run it from the directory holding the .env file and the database, like the app.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules main.py imported at the top before pages were loaded on demand
+EAGER_MODULES = ["GPT.gpt3_zero_shot", "GPT.gpt3_one_shot", "GPT.gpt3_few_shot", "GPT.gpt4_zero_shot",
+                 "GPT.gpt4_one_shot", "GPT.gpt4_few_shot", "Llama.llama_zero_shot", "Llama.llama_one_shot",
+                 "all_strategies", "compare_page", "prompt_saver", "result_view", "schema_catalog"]
+
+# Program run in each fresh process; it prints the seconds taken and the modules loaded
+CHILD = """
+import importlib, json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+tester_seconds = time.perf_counter() - start
+for name in {eager}:
+    importlib.import_module(name)
+at = AppTest.from_file({main!r}, default_timeout=300)
+at.run()
+if {page!r} != "Home Page":
+    at.sidebar.radio[0].set_value({page!r}).run()
+print(json.dumps({{"seconds": time.perf_counter() - start - tester_seconds, "modules": len(sys.modules),
+                  "exceptions": [e.value for e in at.exception]}}))
+"""
+
+
+def run_once(page, eager):
+    """Render a page in a new process and return its measurements."""
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    code = CHILD.format(eager=EAGER_MODULES if eager else [], main=os.path.join(app_dir, "main.py"), page=page)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [app_dir, os.environ.get("PYTHONPATH")])))
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", default=["Home Page", "GPT 3.5", "Saved Prompts"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'Page':<15} {'Imports':<8} {'Median (s)':>10} {'Min (s)':>8} {'Modules':>8}")
+    for page in args.pages:
+        for eager in (True, False):
+            runs = [run_once(page, eager) for _ in range(args.repeat)]
+            for run in runs:
+                if run["exceptions"]:
+                    print(f"{page}: {run['exceptions'][0]}", file=sys.stderr)
+            seconds = [run["seconds"] for run in runs]
+            print(f"{page:<15} {'eager' if eager else 'lazy':<8} {statistics.median(seconds):>10.2f} "
+                  f"{min(seconds):>8.2f} {runs[-1]['modules']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import hashlib
+import math
+import numbers
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from all_strategies import show_result
+from GPT import gpt3_zero_shot, gpt3_one_shot, gpt3_few_shot, gpt4_zero_shot, gpt4_one_shot, gpt4_few_shot
+from Llama import llama_zero_shot, llama_one_shot
+from llm_client import get_api_key
+from pipeline import MODEL_LABELS, STRATEGY_LABELS, cancel_all, start_all
+from prompt_saver import add_prompt
+from result_view import wait_with_cancel
+from schema_catalog import fetch_schema_prompt
+from sql_cache import lookup_sql, store_sql
+
+# Every model and prompting strategy, in the order they are shown
+COMPARE_APPS = [gpt3_zero_shot, gpt3_one_shot, gpt3_few_shot, gpt4_zero_shot, gpt4_one_shot, gpt4_few_shot,
+                llama_zero_shot, llama_one_shot]
+
+# Number of model calls in flight at once, enough to send every strategy together
+COMPARE_CONCURRENCY = len(COMPARE_APPS)
+
+
+def _signature_value(v):
+    """Give equal values one form: 23, 23.0 and Decimal('23') become the int 23 and every kind of null None."""
+    if v is None or v is pd.NA or v is pd.NaT:
+        return None
+    if isinstance(v, (bool, np.bool_)):
+        return bool(v)
+    if isinstance(v, numbers.Integral):
+        return int(v)
+    if isinstance(v, numbers.Number):
+        v = float(v)
+        if math.isnan(v):
+            return None
+        # Adding 0.0 turns -0.0 into 0.0
+        v = round(v, 6) + 0.0
+        return int(v) if v.is_integer() else v
+    return v
+
+
+def result_signature(result):
+    """Hash the rows of a result regardless of their order and of the column aliases.
+
+    Two queries with the same signature returned the same data. Numbers are
+    compared by value whatever their type, and floats are rounded so that
+    different ways of computing an average still match.
+    Results cut at the row or byte limit hold only some of their rows, which
+    cannot be compared, so their signature is None.
+    """
+    if result.attrs.get("truncated"):
+        return None
+    rows = sorted(repr(tuple(_signature_value(v) for v in row)) for row in result.itertuples(index=False, name=None))
+    return hashlib.sha256("\n".join(rows).encode('utf-8')).hexdigest()
+
+
+def compare_page():
+    st.title("Compare All Strategies")
+    st.write("Ask one question and compare the SQL of every model and prompting strategy side by side.")
+
+    query = st.text_area('Enter your text to generate SQL queries', '', key='compare_query')
+    if not st.button('Compare', key='compare_generate') or len(query) == 0:
+        return
+
+    apps = {app.CATEGORY: app.PIPELINE for app in COMPARE_APPS}
+    api_keys = {category: get_api_key(app.provider) for category, app in apps.items()}
+    runs = {category: {"sql_query": None, "source": None, "error": None, "llm_seconds": None} for category in apps}
+    jobs = {}
+    start = time.perf_counter()
+
+    schema_info_str = None
+    for category, app in apps.items():
+        if not api_keys[category]:
+            runs[category].update(source="missing key", error="API key not found. Please set it in the .env file.")
+            continue
+        sql_query = lookup_sql(app.model, app.strategy, query)
+        if sql_query is not None:
+            runs[category]["source"] = "cache"
+            jobs[category] = {"pipeline": app, "sql_query": sql_query}
+            continue
+        if schema_info_str is None:
+            schema_info_str = fetch_schema_prompt(query) or ""
+        if not schema_info_str:
+            runs[category].update(source="no schema", error="The database schema could not be read.")
+            continue
+        runs[category]["source"] = "generated"
+        jobs[category] = {"pipeline": app, "api_key": api_keys[category],
+                          "request": app.sql_request(query, schema_info_str)}
+
+    with st.spinner(f"Generating {len(jobs)} SQL queries..."):
+        started = start_all(jobs, concurrency=COMPARE_CONCURRENCY)
+    try:
+        for category, run in started.items():
+            runs[category].update(sql_query=run["sql_query"], generated=run["generated"], error=run["error"],
+                                  llm_seconds=run["generation_seconds"])
+            if run["repaired"] is not None:
+                runs[category]["source"] = "generated, repaired" if run["repaired"] else "generated, repair failed"
+            if run["query"] is not None:
+                runs[category]["result"] = wait_with_cancel(run["query"], f"compare_{category}")
+                runs[category]["sql_seconds"] = run["query"][1].get("seconds")
+    finally:
+        # A cancel click or a rerun leaves the loop early; stop the queries not waited for yet
+        cancel_all(started)
+
+    st.caption(f"All strategies finished in {time.perf_counter() - start:.1f} s")
+
+    # Strategies returning the same rows share a group letter
+    groups = {}
+    for category, run in runs.items():
+        result = run.get("result")
+        if result is None:
+            continue
+        if isinstance(result, str):
+            run["error"] = result
+            continue
+        signature = result_signature(result)
+        if signature is None:
+            run["group"] = "not compared, too many rows"
+        else:
+            run["group"] = groups.setdefault(signature, chr(ord("A") + len(groups)))
+        if run["generated"]:
+            store_sql(apps[category].model, apps[category].strategy, query, run["sql_query"])
+        add_prompt(category, {"prompt": query, "sql_query": run["sql_query"], "results": result})
+
+    st.dataframe(pd.DataFrame({
+        "Model": [MODEL_LABELS[apps[category].model] for category in runs],
+        "Strategy": [STRATEGY_LABELS[apps[category].strategy] for category in runs],
+        "SQL from": [run["source"] for run in runs.values()],
+        "Generation (s)": [run["llm_seconds"] for run in runs.values()],
+        "Execution (s)": [run.get("sql_seconds") for run in runs.values()],
+        "Rows": [None if run["error"] else len(run["result"]) for run in runs.values()],
+        "Same result as": [run.get("group") or "error" for run in runs.values()],
+    }), hide_index=True)
+
+    for category, run in runs.items():
+        app = apps[category]
+        with st.expander(f"{MODEL_LABELS[app.model]} {STRATEGY_LABELS[app.strategy]}"):
+            if run["sql_query"] is not None:
+                st.code(run["sql_query"], language='sql')
+            show_result(run["sql_query"], run["error"] or run["result"], f"compare_{category}")
@@ -0,0 +1,44 @@
+import os
+import threading
+
+import duckdb
+import streamlit as st
+
+# Path to the DuckDB database file; the DATABASE_FILE environment variable points the app at another one
+DATABASE_FILE = os.environ.get('DATABASE_FILE', 'isrecon_all.duckdb')
+
+# Per-thread storage for cursors; a DuckDB cursor must not be shared between threads
+_local = threading.local()
+
+
+def database_version():
+    """Fingerprint the database file by its modification time and size."""
+    try:
+        stat = os.stat(DATABASE_FILE)
+    except OSError:
+        return 'missing'
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+@st.cache_resource(max_entries=1)
+def _open_database(version):
+    """Open the DuckDB database in read-only mode for one file version."""
+    return duckdb.connect(database=DATABASE_FILE, read_only=True)
+
+
+def get_database():
+    """Return the process-wide database handle, reopening it if the file was replaced."""
+    return _open_database(database_version())
+
+
+def get_cursor():
+    """Return the calling thread's cursor on the shared database handle.
+
+    Cursors share the catalog and buffer pool of the single database handle,
+    so handing one out costs no file open or catalog load.
+    """
+    database = get_database()
+    if getattr(_local, 'database', None) is not database:
+        _local.cursor = database.cursor()
+        _local.database = database
+    return _local.cursor
@@ -0,0 +1,370 @@
+"""Build a synthetic database with the schema of isrecon_all.duckdb, at any scale, for load testing.
+
+    python generate_database.py --scale 10 --output isrecon_all.duckdb
+
+The tables and columns are those described in schema_catalog.additional_info.
+Every row count follows the number of papers, which is SYNTHETIC_PAPERS times
+the scale factor, while the ontology stays the same size. The data is skewed
+the way the real corpus is:
+
+- a few journals and conferences publish most papers, mostly in recent years
+- paper length varies several-fold
+- a small set of ontology entities makes up most mentions
+- prolific authors appear on many papers
+- a few works collect most citations
+
+Values are derived from hashes of the row ids and the seed, so the same
+scale and seed always give the same database.
+"""
+import argparse
+import os
+import sys
+import time
+
+import duckdb
+
+# Papers at scale factor 1
+SYNTHETIC_PAPERS = 2000
+
+# Key terms of the ontology; qualified variants of them complete it
+ONTOLOGY_TERMS = [
+    "survey", "case study", "digital platform", "business intelligence", "blockchain technology",
+    "supply chain management", "machine learning", "artificial intelligence", "enterprise resource planning",
+    "technology acceptance model", "design science", "structural equation modeling", "grounded theory",
+    "digital transformation", "social media", "electronic commerce", "information security", "privacy",
+    "cloud computing", "big data", "decision support system", "knowledge management", "it governance",
+    "user satisfaction", "trust", "online community", "crowdsourcing", "sharing economy", "mobile app", "fintech",
+    "health information system", "e-government", "open source software", "agile development",
+    "project management", "it outsourcing", "it capability", "dynamic capabilities", "resource-based view",
+    "institutional theory", "sociotechnical system", "interview", "experiment", "literature review",
+    "action research", "regression analysis", "panel data", "text mining", "topic modeling",
+    "recommender system", "chatbot", "virtual team", "gamification", "digital innovation",
+    "platform ecosystem", "algorithmic management", "explainable ai", "cybersecurity", "data governance",
+    "business process management",
+]
+ONTOLOGY_QUALIFIERS = ["digital", "organizational", "mobile", "collaborative"]
+
+# Top level branches of the ontology
+ONTOLOGY_LABELS = ["Research Method", "Theory", "Technology", "Application Domain", "Organizational Concept",
+                   "User Behavior"]
+
+# Journals and conferences with their acronyms, the most prolific first
+JOURNALS = [
+    ("International Conference on Information Systems", "ICIS"),
+    ("European Conference On Information Systems", "ECIS"),
+    ("Americas Conference on Information Systems", "AMCIS"),
+    ("Hawaii International Conference on System Sciences", "HICSS"),
+    ("Pacific Asia Conference on Information Systems", "PACIS"),
+    ("Wirtschaftsinformatik", "WI"),
+    ("Decision Support Systems", "DSS"),
+    ("Information & Management", "I&M"),
+    ("International Journal of Information Management", "IJIM"),
+    ("Communications of the Association for Information Systems", "CAIS"),
+    ("Electronic Markets", "EM"),
+    ("Management Information Systems Quarterly", "MISQ"),
+    ("Information Systems Research", "ISR"),
+    ("Journal of Management Information Systems", "JMIS"),
+    ("Journal of the Association for Information Systems", "JAIS"),
+    ("European Journal of Information Systems", "EJIS"),
+    ("Information Systems Journal", "ISJ"),
+    ("Journal of Strategic Information Systems", "JSIS"),
+    ("Journal of Information Technology", "JIT"),
+    ("Business & Information Systems Engineering", "BISE"),
+    ("ACM SIGMIS Database", "DATABASE"),
+    ("Group Decision and Negotiation", "GDN"),
+    ("Information and Organization", "I&O"),
+    ("Organization Science", "OrgSci"),
+    ("ACM Transactions on Management Information Systems", "TMIS"),
+    ("DESRIST", "DESRIST"),
+]
+
+FIRST_NAMES = ["Anna", "Ben", "Carla", "David", "Elena", "Felix", "Grace", "Hannah", "Ivan", "Julia", "Kai", "Laura",
+               "Marco", "Nina", "Oliver", "Paula", "Quentin", "Rosa", "Stefan", "Tina", "Uwe", "Vera", "Wei", "Xenia",
+               "Yusuf", "Zoe", "Jessica", "Sarah", "Raza", "Victor"]
+LAST_NAMES = ["Smith", "Müller", "Garcia", "Chen", "Kumar", "Schmidt", "Rossi", "Nguyen", "Kim", "Johnson", "Weber",
+              "Silva", "Tanaka", "Novak", "Brown", "Fischer", "Lopez", "Wang", "Ivanova", "Becker", "Jones", "Meyer",
+              "Kowalski", "Okafor", "Larsen", "Dubois", "Ahmed", "Hoffmann", "Martin", "Wagner", "Lee", "Schulz",
+              "Santos", "Bauer", "Patel", "Richter", "Klein", "Wolf", "Moreau", "Berg"]
+INSTITUTIONS = ["University of Cologne", "Technical University of Munich", "London School of Economics",
+                "University of Mannheim", "National University of Singapore", "University of Minnesota",
+                "Copenhagen Business School", "University of St. Gallen", "Georgia State University",
+                "Karlsruhe Institute of Technology", "University of Queensland", "HEC Paris", "Aalto University",
+                "University of Auckland", "Indiana University", "Erasmus University Rotterdam",
+                "University of Münster", "Lund University", "City University of Hong Kong", "University of Arizona"]
+
+# Section titles in the order they appear in a paper, with the sentence type of their sentences
+SECTIONS = [("Introduction", "introduction"), ("Literature Review", "background"),
+            ("Theoretical Background", "background"), ("Research Method", "method"), ("Results", "results"),
+            ("Discussion", "discussion"), ("Conclusion", "conclusion")]
+
+# Sentence and title patterns; {a} and {b} are filled with ontology terms, {n} with a number
+SENTENCE_TEMPLATES = [
+    "We examine how {a} shapes {b} in organizations.",
+    "Prior research on {a} has largely overlooked the role of {b}.",
+    "Our findings indicate that {a} is positively associated with {b}.",
+    "We conducted a {b} with {n} participants to study {a}.",
+    "The results of the {b} suggest that {a} matters more than previously assumed.",
+    "Drawing on {b}, we theorize the effects of {a}.",
+    "This paper contributes to the literature on {a} and {b}.",
+    "Managers should consider {a} when investing in {b}.",
+    "Table {n} summarizes the measures of {a} used in the {b}.",
+    "Future research could extend our study of {a} to other contexts such as {b}.",
+]
+TITLE_TEMPLATES = [
+    "The Role of {a} in {b}", "Understanding {a}: A {b}", "{a} and {b}: Evidence from {n} Firms",
+    "How {a} Shapes {b}", "Towards a Theory of {a}", "Designing {a} for {b}",
+]
+
+# Share of sentences that mention an ontology entity
+ENTITY_RATE = 0.3
+
+# Sentences per paragraph and abstract sentences per paper
+SENTENCES_PER_PARAGRAPH = 6
+ABSTRACT_SENTENCES = 6
+
+
+def _sql_list(values):
+    return "[" + ", ".join("'" + str(value).replace("'", "''") + "'" for value in values) + "]"
+
+
+def ontology():
+    """List the ent_ids of the ontology with their label and synonyms."""
+    ent_ids = list(ONTOLOGY_TERMS)
+    ent_ids += [f"{qualifier} {term}" for qualifier in ONTOLOGY_QUALIFIERS for term in ONTOLOGY_TERMS
+                if qualifier not in term]
+    entries = []
+    for index, ent_id in enumerate(ent_ids):
+        synonyms = [ent_id, f"{ent_id} research"]
+        # Plurals only where appending an s gives one
+        if ent_id[-1] not in "sy":
+            synonyms.append(f"{ent_id}s")
+        if " " in ent_id:
+            synonyms.append("".join(word[0] for word in ent_id.split()).upper())
+        entries.append({"ent_id": ent_id, "label": ONTOLOGY_LABELS[index % len(ONTOLOGY_LABELS)],
+                        "synonyms": synonyms[:1 + index % len(synonyms)]})
+    return entries
+
+
+def _define_macros(conn, seed, entries):
+    synonyms = [synonym for entry in entries for synonym in entry["synonyms"]]
+    # Position of the first synonym of every entity in the list of all synonyms
+    starts = [0]
+    for entry in entries[:-1]:
+        starts.append(starts[-1] + len(entry["synonyms"]))
+    sections = len(SECTIONS)
+    macros = [
+        # A uniform number in [0, 1) and a skewed index in [0, n), both fixed by the row, a salt and the seed
+        f"u(x, salt) AS (hash(x, salt, {seed}) % 1000003) / 1000003.0",
+        "skewed(x, salt, n, s) AS least(n - 1, floor(n * pow(u(x, salt), s)))::BIGINT",
+        f"ent_id_at(i) AS ({_sql_list([entry['ent_id'] for entry in entries])})[i::BIGINT + 1]",
+        f"label_at(i) AS ({_sql_list([entry['label'] for entry in entries])})[i::BIGINT + 1]",
+        f"synonym_at(e, x) AS ({_sql_list(synonyms)})[({starts})[e + 1] + (hash(x, 'synonym') % "
+        f"({[len(entry['synonyms']) for entry in entries]})[e + 1])::BIGINT + 1]",
+        f"journal_at(i) AS ({_sql_list([name for name, _ in JOURNALS])})[i::BIGINT + 1]",
+        f"akronym_at(i) AS ({_sql_list([akronym for _, akronym in JOURNALS])})[i::BIGINT + 1]",
+        f"first_name_at(i) AS ({_sql_list(FIRST_NAMES)})[(i % {len(FIRST_NAMES)})::BIGINT + 1]",
+        f"last_name_at(i) AS ({_sql_list(LAST_NAMES)})"
+        f"[((i + i // {len(FIRST_NAMES)}) % {len(LAST_NAMES)})::BIGINT + 1]",
+        f"institution_at(i) AS ({_sql_list(INSTITUTIONS)})[(i % {len(INSTITUTIONS)})::BIGINT + 1]",
+        f"section_title_at(i) AS ({_sql_list([title for title, _ in SECTIONS])})[least(i, {sections})]",
+        f"sentence_type_at(i) AS ({_sql_list([kind for _, kind in SECTIONS])})[least(i, {sections})]",
+        f"fill(template, a, b, n) AS replace(replace(replace(template, '{{a}}', a), '{{b}}', b), '{{n}}', n::VARCHAR)",
+        f"sentence_template_at(i) AS ({_sql_list(SENTENCE_TEMPLATES)})[(i % {len(SENTENCE_TEMPLATES)})::BIGINT + 1]",
+        f"title_template_at(i) AS ({_sql_list(TITLE_TEMPLATES)})[(i % {len(TITLE_TEMPLATES)})::BIGINT + 1]",
+    ]
+    for macro in macros:
+        conn.execute(f"CREATE TEMP MACRO {macro}")
+
+
+def generate(path, scale=1.0, seed=0):
+    """Write a synthetic database to path and return the row count of every table."""
+    papers = max(1, round(SYNTHETIC_PAPERS * scale))
+    entries = ontology()
+    terms = len(entries)
+    journals = len(JOURNALS)
+    # Authors and cited works grow with the corpus
+    author_pool = max(10, round(papers * 1.5))
+    external_works = papers * 4
+
+    conn = duckdb.connect(path)
+    _define_macros(conn, seed, entries)
+
+    # Shape of each paper: its journal, year, length and how many authors, keywords and references it has
+    conn.execute(f"""
+        CREATE TEMP TABLE paper_shape AS
+        SELECT i AS article_id,
+               skewed(i, 'journal', {journals}, 1.8) AS journal_idx,
+               2024 - skewed(i, 'year', 35, 1.5) AS year,
+               {ABSTRACT_SENTENCES} + 40 + floor(320 * pow(u(i, 'length'), 1.5))::INT AS n_sentences,
+               4 + floor(9 * u(i, 'sections'))::INT AS n_sections,
+               1 + floor(5 * pow(u(i, 'authors'), 1.5))::INT AS n_authors,
+               3 + floor(5 * u(i, 'keywords'))::INT AS n_keywords,
+               10 + floor(60 * u(i, 'references'))::INT AS n_references,
+               skewed(i, 'first_author', {author_pool}, 2) AS first_author,
+               fill(title_template_at(hash(i, 'title')), ent_id_at(skewed(i, 'title_a', {terms}, 2.5)),
+                    ent_id_at(skewed(i, 'title_b', {terms}, 1.5)), 2 + hash(i, 'n') % 500) AS title
+        FROM range({papers}) t(i)
+    """)
+
+    conn.execute(f"""
+        CREATE TABLE authors AS
+        SELECT article_id, position AS author_position,
+               first_name_at(author) || ' ' || CASE WHEN author >= {len(FIRST_NAMES) * len(LAST_NAMES)}
+                   THEN chr((65 + (author // {len(FIRST_NAMES) * len(LAST_NAMES)}) % 26)::INT) || '. ' ELSE '' END
+                   || last_name_at(author) AS full_name,
+               institution_at(author) AS institutions
+        FROM (
+            SELECT article_id, position,
+                   CASE WHEN position = 1 THEN first_author
+                        ELSE skewed(article_id * 10 + position, 'author', {author_pool}, 2) END AS author
+            FROM (SELECT article_id, first_author, unnest(range(1, n_authors + 1)) AS position FROM paper_shape)
+        )
+    """)
+
+    conn.execute(f"""
+        CREATE TABLE keywords AS
+        SELECT article_id, ent_id_at(skewed(article_id * 10 + k, 'keyword', {terms}, 2.5)) AS keyword
+        FROM (SELECT article_id, unnest(range(n_keywords)) AS k FROM paper_shape)
+    """)
+
+    conn.execute(f"""
+        CREATE TEMP TABLE paper_keys AS
+        SELECT s.article_id,
+               lower(regexp_replace(a.full_name, '^.* ', '')) || s.year || '_' || s.article_id AS citekey
+        FROM paper_shape s JOIN authors a ON a.article_id = s.article_id AND a.author_position = 1
+    """)
+
+    # Popular works collect most citations; works below the number of papers are papers of the database
+    conn.execute(f"""
+        CREATE TEMP TABLE cited AS
+        SELECT s.article_id, k.citekey AS paper_citekey, r.ref,
+               s.article_id * 100 + floor((s.n_sentences // {SENTENCES_PER_PARAGRAPH}) * u(r.ref, 'para'))::INT
+                   AS para_id,
+               skewed(s.article_id * 1000 + r.ref, 'cites', {papers + external_works}, 2) AS work
+        FROM paper_shape s JOIN paper_keys k ON k.article_id = s.article_id,
+             LATERAL (SELECT unnest(range(s.n_references)) AS ref) r
+    """)
+    conn.execute("""
+        CREATE TEMP TABLE cited_keys AS
+        SELECT c.*, coalesce(k.citekey, 'ref' || c.work) AS reference_citekey
+        FROM cited c LEFT JOIN paper_keys k ON k.article_id = c.work
+    """)
+    conn.execute("CREATE TABLE citations AS SELECT reference_citekey, paper_citekey FROM cited_keys")
+    conn.execute("CREATE TABLE sources AS SELECT DISTINCT reference_citekey AS citekey, para_id FROM cited_keys")
+
+    conn.execute(f"""
+        CREATE TABLE papers AS
+        SELECT s.article_id, k.citekey, s.title,
+               fill(sentence_template_at(hash(s.article_id, 'abstract_1')),
+                    ent_id_at(skewed(s.article_id, 'abstract_a', {terms}, 2.5)),
+                    ent_id_at(skewed(s.article_id, 'abstract_b', {terms}, 2)), 2 + s.article_id % 400) || ' ' ||
+               fill(sentence_template_at(hash(s.article_id, 'abstract_2')),
+                    ent_id_at(skewed(s.article_id, 'abstract_c', {terms}, 2.5)),
+                    ent_id_at(skewed(s.article_id, 'abstract_d', {terms}, 2)), 2 + s.article_id % 90) || ' ' ||
+               fill(sentence_template_at(hash(s.article_id, 'abstract_3')),
+                    ent_id_at(skewed(s.article_id, 'abstract_e', {terms}, 2.5)),
+                    ent_id_at(skewed(s.article_id, 'abstract_f', {terms}, 2)), 2 + s.article_id % 30) AS abstract,
+               journal_at(s.journal_idx) AS journal, akronym_at(s.journal_idx) AS journal_akronym, s.year,
+               kw.keywords, coalesce(c.citation_count, 0) AS citation_count
+        FROM paper_shape s
+        JOIN paper_keys k ON k.article_id = s.article_id
+        LEFT JOIN (SELECT article_id, string_agg(keyword, ', ') AS keywords FROM keywords GROUP BY article_id) kw
+            ON kw.article_id = s.article_id
+        LEFT JOIN (SELECT reference_citekey, count(*) AS citation_count FROM citations GROUP BY reference_citekey) c
+            ON c.reference_citekey = k.citekey
+        ORDER BY s.article_id
+    """)
+
+    conn.execute(f"""
+        CREATE TABLE subsections AS
+        SELECT article_id * 100 + section_nr AS section_id, article_id, section_nr,
+               section_title_at(section_nr) AS section_title,
+               CASE WHEN u(article_id * 100 + section_nr, 'subsection') < 0.5
+                    THEN ent_id_at(skewed(article_id * 100 + section_nr, 'subsection_term', {terms}, 2)) END
+                   AS subsection_title
+        FROM (SELECT article_id, unnest(range(1, n_sections + 1)) AS section_nr FROM paper_shape)
+    """)
+
+    # The abstract comes first, with section number 0; the other sentences are spread over the sections
+    conn.execute(f"""
+        CREATE TEMP TABLE sentence_rows AS
+        SELECT article_id, position, article_id * 1000 + position AS sentence_id,
+               CASE WHEN position < {ABSTRACT_SENTENCES} THEN 0
+                    ELSE 1 + (position - {ABSTRACT_SENTENCES}) * n_sections // (n_sentences - {ABSTRACT_SENTENCES})
+               END AS section_nr,
+               article_id * 100 + position // {SENTENCES_PER_PARAGRAPH} AS para_id,
+               skewed(article_id * 1000 + position, 'entity', {terms}, 2.5) AS ent,
+               u(article_id * 1000 + position, 'mentions') < {ENTITY_RATE} AS mentions
+        FROM (SELECT article_id, n_sentences, n_sections, unnest(range(n_sentences)) AS position FROM paper_shape)
+    """)
+    conn.execute(f"""
+        CREATE TABLE sentences AS
+        SELECT r.article_id, r.sentence_id,
+               CASE WHEN r.section_nr > 0 THEN r.article_id * 100 + r.section_nr END AS section_id,
+               CASE WHEN r.section_nr = 0 THEN 'Abstract' ELSE section_title_at(r.section_nr) END
+                   AS last_section_title,
+               s.subsection_title AS last_subsection_title,
+               r.section_nr, r.para_id,
+               CASE WHEN r.section_nr = 0 THEN 'abstract' ELSE sentence_type_at(r.section_nr) END AS sentence_type,
+               fill(sentence_template_at(hash(r.sentence_id, 'template')),
+                    CASE WHEN r.mentions THEN synonym_at(r.ent, r.sentence_id)
+                         ELSE (['the study', 'the firm', 'the market', 'the context'])[(r.sentence_id % 4) + 1]
+                    END,
+                    ent_id_at(skewed(r.sentence_id, 'other', {terms}, 1.5)), 1 + r.sentence_id % 400)
+                   AS sentence_original,
+               r.mentions, r.ent
+        FROM sentence_rows r
+        LEFT JOIN subsections s ON s.article_id = r.article_id AND s.section_nr = r.section_nr
+        ORDER BY r.sentence_id
+    """)
+    conn.execute("""
+        CREATE TABLE entities AS
+        SELECT article_id, sentence_id, ent_id_at(ent) AS ent_id, synonym_at(ent, sentence_id) AS entity,
+               sentence_original AS sentence
+        FROM sentences WHERE mentions
+    """)
+    conn.execute("ALTER TABLE sentences DROP COLUMN mentions")
+    conn.execute("ALTER TABLE sentences DROP COLUMN ent")
+    conn.execute("CREATE TABLE paragraphs AS SELECT DISTINCT para_id, article_id FROM sentence_rows ORDER BY para_id")
+
+    conn.execute(f"""
+        CREATE TABLE ontology AS
+        SELECT ent_id_at(i) AS ent_id,
+               ent_id_at(i) || ' is a concept of information systems research in the branch ' || label_at(i) || '.'
+                   AS definition,
+               label_at(i) AS label
+        FROM range({terms}) t(i)
+    """)
+    conn.execute("CREATE TABLE synonyms (ent_id VARCHAR, synonym VARCHAR)")
+    conn.executemany("INSERT INTO synonyms VALUES (?, ?)",
+                     [(entry["ent_id"], synonym) for entry in entries for synonym in entry["synonyms"]])
+
+    counts = {table: conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+              for table in ["papers", "sentences", "paragraphs", "entities", "ontology", "citations", "sources",
+                            "authors", "keywords", "subsections", "synonyms"]}
+    conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0, help=f"scale factor; 1 is {SYNTHETIC_PAPERS} papers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="isrecon_all.duckdb")
+    parser.add_argument("--force", action="store_true", help="replace the output file if it exists")
+    args = parser.parse_args()
+
+    if os.path.exists(args.output):
+        if not args.force:
+            sys.exit(f"{args.output} already exists; pass --force to replace it.")
+        os.remove(args.output)
+    start = time.perf_counter()
+    counts = generate(args.output, args.scale, args.seed)
+    for table, count in counts.items():
+        print(f"{table:<12} {count:>12,}")
+    print(f"Written to {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB) "
+          f"in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
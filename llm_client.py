@@ -0,0 +1,101 @@
+import asyncio
+import os
+import time
+
+import openai
+import streamlit as st
+from dotenv import dotenv_values
+from groq import AsyncGroq, Groq
+
+# Seconds a single completion may take before it is given up
+LLM_TIMEOUT = 60
+
+# Maximum number of completions in flight at the same time
+LLM_CONCURRENCY = 4
+
+# Names of the API keys of each provider in the .env file
+API_KEY_NAMES = {"openai": "OPENAI_API_KEY", "groq": "GROQ_API_KEY"}
+
+
+def get_api_key(provider):
+    """Read a provider's API key from the .env file, or None if it is not set."""
+    return dotenv_values(".env").get(API_KEY_NAMES[provider])
+
+
+def use_base_url(base_url):
+    """Send every model call of this process to another server with the same API, such as a local stand-in.
+
+    Both clients read their server from the environment when they are created;
+    Groq's API lives under /openai/v1 and OpenAI's under /v1 of the given URL.
+    """
+    os.environ["OPENAI_BASE_URL"] = base_url.rstrip("/") + "/v1"
+    os.environ["GROQ_BASE_URL"] = base_url.rstrip("/")
+
+
+@st.cache_resource
+def get_client(provider, api_key):
+    """Create the client of a provider once per API key and share it between reruns and sessions."""
+    if provider == "groq":
+        return Groq(api_key=api_key, timeout=LLM_TIMEOUT)
+    return openai.OpenAI(api_key=api_key, timeout=LLM_TIMEOUT)
+
+
+def _async_client(provider, api_key):
+    if provider == "groq":
+        return AsyncGroq(api_key=api_key)
+    return openai.AsyncOpenAI(api_key=api_key)
+
+
+async def _complete(client, request, semaphore, timeout):
+    """Run one chat completion and report its text or error and how long it took."""
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(client.chat.completions.create(**request), timeout)
+            return {"content": response.choices[0].message.content or "", "error": None,
+                    "seconds": time.perf_counter() - start}
+        except asyncio.TimeoutError:
+            error = f"No response within {timeout} seconds"
+        except Exception as e:
+            error = f"LLM request failed: {e}"
+        return {"content": None, "error": error, "seconds": time.perf_counter() - start}
+
+
+async def _complete_all(jobs, on_complete, timeout, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    # One client per provider and key, created on this event loop
+    clients = {}
+    for provider, api_key, _ in jobs.values():
+        if (provider, api_key) not in clients:
+            clients[provider, api_key] = _async_client(provider, api_key)
+
+    async def run(name, provider, api_key, request):
+        return name, await _complete(clients[provider, api_key], request, semaphore, timeout)
+
+    completions = {}
+    try:
+        tasks = [run(name, *job) for name, job in jobs.items()]
+        for finished in asyncio.as_completed(tasks):
+            name, completion = await finished
+            completions[name] = completion
+            if on_complete is not None:
+                on_complete(name, completion)
+    finally:
+        for client in clients.values():
+            await client.close()
+    return completions
+
+
+def complete_all(jobs, on_complete=None, timeout=LLM_TIMEOUT, concurrency=LLM_CONCURRENCY):
+    """Run several chat completions concurrently and return their results by name.
+
+    `jobs` maps a name to (provider, api_key, request), where provider is
+    "openai" or "groq" and request holds the keyword arguments of
+    chat.completions.create. Each result is a dict with the reply `content`,
+    an `error` message if the call failed or timed out, and the `seconds` it
+    took. `on_complete(name, result)` is called on the calling thread as each
+    completion finishes, so the page can show it without waiting for the rest.
+    """
+    if not jobs:
+        return {}
+    return asyncio.run(_complete_all(jobs, on_complete, timeout, concurrency))
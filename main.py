@@ -1,18 +1,17 @@
 import streamlit as st
-from Llama.llama_zero_shot import llama_zero_shot_app
-from Llama.llama_one_shot import llama_one_shot_app
-from GPT.gpt3_one_shot import gpt3_one_shot_app
-from GPT.gpt3_few_shot import gpt3_few_shot_app
-from GPT.gpt3_zero_shot import gpt3_zero_shot_app
-from GPT.gpt4_zero_shot import gpt4_zero_shot_app
-from GPT.gpt4_one_shot import gpt4_one_shot_app
-from GPT.gpt4_few_shot import gpt4_few_shot_app
-from prompt_saver import prompts_page
+
+# Page modules are imported inside the branch of their page, so starting the app and
+# opening the home page load neither the model clients nor the database
 
 # Create a sidebar for navigation
 def main():
     st.sidebar.title("Navigation")
-    page = st.sidebar.radio("Go to", ["Home Page", "GPT 3.5", "GPT 4", "Llama", "Saved Prompts"])
+    page = st.sidebar.radio("Go to", ["Home Page", "GPT 3.5", "GPT 4", "Llama", "Compare", "Saved Prompts"])
+    if page in ["GPT 3.5", "GPT 4", "Llama", "Compare"]:
+        from result_view import query_settings_sidebar
+        from schema_catalog import schema_settings_sidebar
+        schema_settings_sidebar()
+        query_settings_sidebar()
 
 # Define the content for each page
     if page == "Home Page":
@@ -26,25 +25,52 @@ def main():
         st.write("- You can navigate to the GPT 3 page to use GPT-3.5 Turbo to generate SQL queries using both zero-shot, one-shot and few-shot prompting strategies.")
         st.write("- You can navigate to the GPT 4 page to use GPT-4 to generate SQL queries using zero-shot, one-shot and few-shot prompting strategies.")
         st.write("- You can navigate to the Llama page to use Llama 70B to generate SQL queries using both zero-shot and one-shot prompting strategies.")
+        st.write("- You can navigate to the Compare page to run one question through every model and prompting strategy at once.")
         st.write("- You can navigate to the Saved Prompts page to view, add, and delete used prompts.")
         st.text("-------------------------------------------------------------------------------")
         
     elif page == "GPT 3.5":
+            from all_strategies import all_strategies_app
+            from summary_jobs import summary_settings_sidebar
+            from GPT import gpt3_zero_shot, gpt3_one_shot, gpt3_few_shot
+            # Summaries of the results can be switched on or off for the whole page
+            summary_settings_sidebar(gpt3_zero_shot.MODEL, gpt3_zero_shot.SUMMARIZE)
             # Load GPT-3.5 Turbo apps for zero-shot, one-shot, and two-shot prompting
-            gpt3_zero_shot_app()
-            gpt3_one_shot_app()
-            gpt3_few_shot_app()
+            gpt3_zero_shot.gpt3_zero_shot_app()
+            gpt3_one_shot.gpt3_one_shot_app()
+            gpt3_few_shot.gpt3_few_shot_app()
+            # Run the same question through all three strategies concurrently
+            all_strategies_app("GPT 3.5", [gpt3_zero_shot.PIPELINE, gpt3_one_shot.PIPELINE, gpt3_few_shot.PIPELINE], "gpt3.5")
     elif page == "GPT 4":
+            from all_strategies import all_strategies_app
+            from summary_jobs import summary_settings_sidebar
+            from GPT import gpt4_zero_shot, gpt4_one_shot, gpt4_few_shot
+            # Summaries of the results can be switched on or off for the whole page
+            summary_settings_sidebar(gpt4_zero_shot.MODEL, gpt4_zero_shot.SUMMARIZE)
             # Load GPT-4 apps for zero-shot, one-shot, and two-shot prompting
-            gpt4_zero_shot_app()
-            gpt4_one_shot_app()
-            gpt4_few_shot_app()
+            gpt4_zero_shot.gpt4_zero_shot_app()
+            gpt4_one_shot.gpt4_one_shot_app()
+            gpt4_few_shot.gpt4_few_shot_app()
+            # Run the same question through all three strategies concurrently
+            all_strategies_app("GPT 4", [gpt4_zero_shot.PIPELINE, gpt4_one_shot.PIPELINE, gpt4_few_shot.PIPELINE], "gpt4")
     elif page == "Llama":
+            from all_strategies import all_strategies_app
+            from summary_jobs import summary_settings_sidebar
+            from Llama import llama_zero_shot, llama_one_shot
+            # Summaries of the results can be switched on or off for the whole page
+            summary_settings_sidebar(llama_zero_shot.MODEL, llama_zero_shot.SUMMARIZE)
             # Load Llama apps for zero-shot and one-shot prompting
-            llama_zero_shot_app()
-            llama_one_shot_app()
+            llama_zero_shot.llama_zero_shot_app()
+            llama_one_shot.llama_one_shot_app()
+            # Run the same question through both strategies concurrently
+            all_strategies_app("Llama", [llama_zero_shot.PIPELINE, llama_one_shot.PIPELINE], "llama")
+    elif page == "Compare":
+            # Compare all models and strategies on one question
+            from compare_page import compare_page
+            compare_page()
     elif page == "Saved Prompts":
             # Load the Saved Prompts page
+            from prompt_saver import prompts_page
             prompts_page()
 
 if __name__ == "__main__":
@@ -0,0 +1,222 @@
+"""A local stand-in for the OpenAI and Groq chat completion APIs, for offline and repeatable benchmarks.
+
+    python mock_llm.py --port 8000 --profile gpt-4
+    python batch_eval.py questions.jsonl --app gpt4_zero_shot --base-url http://localhost:8000
+
+The server answers POST /v1/chat/completions (OpenAI) and
+/openai/v1/chat/completions (Groq), streamed or not. SQL requests are answered
+with SQL saved for the same question in prompts.json or the prompt history,
+summary requests with a saved summary. Replies arrive after the time to first
+token of the latency profile and then at its token rate. All choices are
+derived from the request, so the same request always gets the same reply
+after the same delay.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from prompt_saver import HISTORY_FILE, PROMPTS_FILE
+from schema_catalog import CHARS_PER_TOKEN
+
+# Seconds to the first token and tokens per second of each latency profile; 0 tokens per second sends the reply at once
+LATENCY_PROFILES = {
+    "instant": {"ttft": 0.0, "tokens_per_second": 0, "jitter": 0.0},
+    "gpt-3.5-turbo": {"ttft": 0.4, "tokens_per_second": 80, "jitter": 0.2},
+    "gpt-4": {"ttft": 0.9, "tokens_per_second": 25, "jitter": 0.2},
+    "llama3-70b-8192": {"ttft": 0.2, "tokens_per_second": 250, "jitter": 0.2},
+}
+
+# Reply to SQL requests for questions that were never saved
+DEFAULT_SQL = "SELECT journal, COUNT(article_id) AS total_articles\nFROM papers\nGROUP BY journal"
+
+# Reply to summary requests when no saved summary exists
+DEFAULT_SUMMARY = "The result lists the number of articles published in each journal."
+
+# Paths the OpenAI and Groq clients post chat completions to
+COMPLETION_PATHS = ("/v1/chat/completions", "/openai/v1/chat/completions")
+
+
+def _normalize(text):
+    return " ".join(str(text).lower().split())
+
+
+def load_canned(prompts_file=PROMPTS_FILE, history_file=HISTORY_FILE):
+    """Collect the saved questions with their SQL and summaries from prompts.json and the prompt history."""
+    canned = []
+    if os.path.exists(prompts_file):
+        with open(prompts_file, 'r') as f:
+            for prompt_list in json.load(f).values():
+                canned += [item for item in prompt_list if isinstance(item, dict)]
+    if os.path.exists(history_file):
+        conn = sqlite3.connect(f"file:{history_file}?mode=ro", uri=True)
+        try:
+            rows = conn.execute("SELECT prompt, sql_query, summary FROM prompts ORDER BY id").fetchall()
+        except sqlite3.Error:
+            rows = []
+        finally:
+            conn.close()
+        canned += [{"prompt": prompt, "sql_query": sql_query, "summary": summary} for prompt, sql_query, summary in rows]
+    return [item for item in canned if item.get("prompt") and item.get("sql_query")]
+
+
+class Replayer:
+    """Pick the reply and the delays of a chat completion request from canned answers and a latency profile."""
+
+    def __init__(self, canned, profile=None, ttft=None, tokens_per_second=None):
+        self.canned = canned
+        self.profile = profile
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+
+    def _pick(self, options, seed):
+        return options[int(seed[:8], 16) % len(options)]
+
+    def reply(self, request, seed):
+        """Answer a request with saved SQL for the question it contains, or with a saved summary."""
+        messages = request.get("messages") or []
+        text = _normalize(messages[-1].get("content", "")) if messages else ""
+        if any("summarization expert" in str(message.get("content")) for message in messages):
+            summaries = [item["summary"].strip() for item in self.canned if (item.get("summary") or "").strip()]
+            return self._pick(summaries, seed) if summaries else DEFAULT_SUMMARY
+        matches = [item for item in self.canned if _normalize(item["prompt"]) in text]
+        if not matches:
+            return DEFAULT_SQL + ";"
+        # The longest question that fits is the most specific match; prompt strategies then vary among its answers
+        longest = max(len(item["prompt"]) for item in matches)
+        return self._pick([item["sql_query"] for item in matches if len(item["prompt"]) == longest], seed) + ";"
+
+    def latency(self, model, seed):
+        """Return the time to first token and the tokens per second for a request, with seeded jitter."""
+        profile = LATENCY_PROFILES.get(self.profile or model, LATENCY_PROFILES["instant"])
+        ttft = profile["ttft"] if self.ttft is None else self.ttft
+        tokens_per_second = profile["tokens_per_second"] if self.tokens_per_second is None else self.tokens_per_second
+        # Jitter between -1 and 1 times the profile's share, the same for the same request
+        jitter = (int(seed[8:16], 16) / 0xFFFFFFFF * 2 - 1) * profile["jitter"]
+        return ttft * (1 + jitter), tokens_per_second * (1 - jitter)
+
+
+def _cut_at_stop(content, stop):
+    if isinstance(stop, str):
+        stop = [stop]
+    for sequence in stop or []:
+        if sequence in content:
+            content = content[:content.index(sequence)]
+    return content
+
+
+def _tokens(content):
+    return [content[i:i + CHARS_PER_TOKEN] for i in range(0, len(content), CHARS_PER_TOKEN)]
+
+
+class CompletionHandler(BaseHTTPRequestHandler):
+    """Serve chat completions in the format of the OpenAI API, which the Groq API shares."""
+
+    protocol_version = "HTTP/1.1"
+    replayer = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.split("?")[0] not in COMPLETION_PATHS:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+        # Streamed and complete requests for the same messages get the same reply
+        choice = {key: value for key, value in request.items() if key not in ("stream", "stream_options")}
+        seed = hashlib.sha256(json.dumps(choice, sort_keys=True).encode('utf-8')).hexdigest()
+        model = request.get("model", "")
+        content = _cut_at_stop(self.replayer.reply(request, seed), request.get("stop"))
+        ttft, tokens_per_second = self.replayer.latency(model, seed)
+        tokens = _tokens(content)
+        completion_id = f"chatcmpl-{seed[:24]}"
+        created = int(time.time())
+        usage = {"prompt_tokens": len(json.dumps(request.get("messages"))) // CHARS_PER_TOKEN,
+                 "completion_tokens": len(tokens)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        time.sleep(ttft)
+        if not request.get("stream"):
+            if tokens_per_second:
+                time.sleep(len(tokens) / tokens_per_second)
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(delta, finish_reason=None):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        try:
+            send({"role": "assistant", "content": ""})
+            for token in tokens:
+                send({"content": token})
+                if tokens_per_second:
+                    time.sleep(1 / tokens_per_second)
+            send({}, "stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream once it had the whole SQL statement
+            pass
+
+
+def start_server(host="127.0.0.1", port=0, profile=None, ttft=None, tokens_per_second=None, canned=None):
+    """Run the stand-in on a background thread and return the server and its base URL.
+
+    Port 0 picks a free port. Call server.shutdown() to stop it.
+    """
+    replayer = Replayer(load_canned() if canned is None else canned, profile, ttft, tokens_per_second)
+    handler = type("Handler", (CompletionHandler,), {"replayer": replayer})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--profile", choices=sorted(LATENCY_PROFILES),
+                        help="latency profile for every request (default: the profile of the requested model)")
+    parser.add_argument("--ttft", type=float, help="seconds to the first token, overriding the profile")
+    parser.add_argument("--tokens-per-second", type=float, help="token rate, overriding the profile (0 = at once)")
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.host, args.port, args.profile, args.ttft, args.tokens_per_second)
+    print(f"Serving chat completions at {base_url} (OpenAI: {base_url}/v1, Groq: {base_url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
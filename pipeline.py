@@ -0,0 +1,228 @@
+import time
+
+import streamlit as st
+
+from llm_client import LLM_CONCURRENCY, LLM_TIMEOUT, complete_all, get_api_key, get_client
+from prompt_saver import add_prompt
+from result_cache import RESULT_ROW_LIMIT
+from result_digest import result_digest
+from result_view import cancel_query, execute_with_cancel, show_rows, submit_query
+from schema_catalog import fetch_schema_prompt
+from sql_cache import lookup_sql, store_sql
+from sql_extraction import cut_reply, extract_gpt_sql, extract_llama_sql, stream_sql
+from sql_repair import check_repair, repair_request, repair_sql, validate_sql
+from summary_jobs import start_summary, summaries_enabled, summary_panel
+
+# Names of the providers in messages, and how the SQL is cut from their replies
+PROVIDER_NAMES = {"openai": "OpenAI", "groq": "Groq"}
+SQL_EXTRACTORS = {"openai": extract_gpt_sql, "groq": extract_llama_sql}
+
+# Names of the models and prompting strategies in headings
+MODEL_LABELS = {"gpt-3.5-turbo": "GPT 3.5", "gpt-4": "GPT 4", "llama3-70b-8192": "Llama"}
+STRATEGY_LABELS = {"zero_shot": "Zero-Shot", "one_shot": "One-Shot", "two_shot": "Few-Shot"}
+
+
+class Pipeline:
+    """Turns a question into SQL, a result and a summary for one model and prompting strategy.
+
+    `sql_request(prompt, schema_info_str)` builds the chat completion request
+    of the strategy. A pipeline is built once per app module and kept for the
+    life of the process; the clients, caches and worker pools its stages use
+    are shared by every page, rerun and session.
+    """
+
+    def __init__(self, provider, model, strategy, category, sql_request, summarize):
+        self.provider = provider
+        self.model = model
+        self.strategy = strategy
+        self.category = category
+        self.sql_request = sql_request
+        self.summarize = summarize
+        self.label = f"{MODEL_LABELS[model]} {STRATEGY_LABELS[strategy]}"
+
+    def extract_sql(self, content):
+        """Cut a complete model reply down to its SQL."""
+        return SQL_EXTRACTORS[self.provider](cut_reply(content))
+
+    def generate_sql(self, api_key, request):
+        """Send a request to the model and return its SQL, showing the query while it streams in."""
+        response = get_client(self.provider, api_key).chat.completions.create(stream=True, **request)
+        return stream_sql(response, SQL_EXTRACTORS[self.provider])
+
+    def summary_request(self, results):
+        """Build the chat completion request that summarizes query results."""
+        # Large results are condensed to statistics and sample rows that fit the token budget
+        content_summary_prompt = f"Provide a detailed summary of the following data:\n\n{result_digest(results)}"
+        return dict(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "You are a summarization expert."},
+                {"role": "user", "content": content_summary_prompt}
+            ],
+            max_tokens=300,
+            stop=["#", ";"]
+        )
+
+    def run(self, query, api_key):
+        """Answer a question on the page: find or generate the SQL, repair it if needed and execute it.
+
+        Returns the SQL, the result (a DataFrame or an error message), the id
+        of the saved prompt and the seconds spent getting the SQL and running it,
+        or None if the schema could not be read.
+        """
+        start = time.perf_counter()
+        # Reuse SQL generated earlier for the same question before calling the model
+        sql_query = lookup_sql(self.model, self.strategy, query)
+        generated = sql_query is None
+        if generated:
+            schema_info_str = fetch_schema_prompt(query)
+            if schema_info_str is None:
+                # The schema could not be read and the error is already shown
+                return None
+            request = self.sql_request(query, schema_info_str)
+            generate = lambda request: self.generate_sql(api_key, request)
+            sql_query = generate(request)
+            # Bind the SQL with EXPLAIN before running it and let the model fix it once if it fails
+            sql_query = repair_sql(self.model, self.strategy, request, sql_query, generate)
+        sql_seconds = time.perf_counter() - start
+
+        st.write("Generated SQL Query:")
+        st.code(sql_query, language='sql')
+        st.subheader(f"{self.label}: Query Results")
+        start = time.perf_counter()
+        result = execute_with_cancel(sql_query, self.category)
+        query_seconds = time.perf_counter() - start
+        if generated and not isinstance(result, str):
+            store_sql(self.model, self.strategy, query, sql_query)
+        prompt_id = add_prompt(self.category, {"prompt": query, "sql_query": sql_query, "results": result})
+        return {"sql_query": sql_query, "generated": generated, "result": result, "prompt_id": prompt_id,
+                "sql_seconds": sql_seconds, "query_seconds": query_seconds}
+
+    def app(self, title=None):
+        """Show the page section of this model and strategy: a question box, the SQL, the result and its summary."""
+        # The API key is read when the page is shown, so a missing key only affects this app
+        api_key = get_api_key(self.provider)
+        if not api_key:
+            st.error(f"{PROVIDER_NAMES[self.provider]} API key not found. Please set it in the .env file.")
+            return
+
+        if title:
+            st.title(title)
+        st.text("-------------------------------------------------------------------------------")
+        strategy = STRATEGY_LABELS[self.strategy]
+        st.subheader(f"{strategy}: Convert natural language to SQL queries with {strategy.lower()} prompting")
+
+        # User input for generating SQL query
+        query = st.text_area('Enter your text to generate SQL query', '', key=f'{self.category}_query')
+        if not st.button('Generate SQL query', key=f'{self.category}_generate') or len(query) == 0:
+            return
+
+        run = self.run(query, api_key)
+        if run is None:
+            return
+        result = run["result"]
+        if isinstance(result, str):
+            st.error(result)
+        elif result.empty:
+            st.warning("No results found.")
+        else:
+            show_rows(run["sql_query"], result, self.category)
+        source = "generated" if run["generated"] else "taken from the cache"
+        st.caption(f"SQL {source} in {run['sql_seconds']:.1f} s, query ran in {run['query_seconds']:.1f} s")
+        # The summary is generated in the background and fills in once ready
+        if not isinstance(result, str) and not result.empty and summaries_enabled(self.model, self.summarize):
+            st.subheader(f"{self.label}: Summary of Results")
+            summary_panel(start_summary(self.provider, api_key, self.summary_request(result), run["prompt_id"]))
+
+
+def start_all(jobs, sections=None, repair=True, max_rows=RESULT_ROW_LIMIT, timeout=None, llm_timeout=LLM_TIMEOUT,
+              concurrency=LLM_CONCURRENCY):
+    """Get the SQL of several questions or pipelines at once and start executing each query in the query workers.
+
+    `jobs` maps a name to a dict with the `pipeline` and either the `sql_query`
+    to run or the `api_key` and the SQL generation `request` to send. All
+    generations are sent concurrently, followed by the repairs of queries that
+    do not bind, so the wait is about as long as the slowest call instead of
+    the sum of all of them. Each query starts as soon as its SQL is known,
+    while other calls are still in flight.
+
+    Returns a record per name with the `sql_query`, whether it was `generated`,
+    the seconds generation and repair took, the `bind_error` and whether the
+    repair fixed it, the `error` of a failed model call and the running `query`
+    for wait_with_cancel, None if there is no SQL to run. The caller waits for
+    the queries and stops the rest with cancel_all. Given `sections`, a
+    container per name, the progress of each call is shown in it and repairs
+    count towards the repair statistics.
+    """
+    runs = {}
+    generate_jobs = {}
+    repair_jobs = {}
+
+    def start_query(name, sql_query):
+        # Only start the query here; waiting for it would hold up the completions still in flight
+        runs[name]["sql_query"] = sql_query
+        runs[name]["query"] = submit_query(sql_query, max_rows, timeout)
+
+    def show(name, message, error=False):
+        if sections:
+            with sections[name]:
+                (st.error if error else st.caption)(message)
+
+    def on_sql(name, completion):
+        run = runs[name]
+        run["generation_seconds"] = completion["seconds"]
+        if completion["error"]:
+            run["error"] = completion["error"]
+            show(name, completion["error"], error=True)
+            return
+        job = jobs[name]
+        sql_query = job["pipeline"].extract_sql(completion["content"])
+        show(name, f"Generated in {completion['seconds']:.1f} s")
+        error = validate_sql(sql_query) if repair else None
+        if error is None:
+            start_query(name, sql_query)
+            return
+        show(name, f"The generated SQL query does not bind, asking the model to fix it: {error}")
+        # Repairs are sent together once every generation has answered
+        run.update(sql_query=sql_query, bind_error=error)
+        repair_jobs[name] = (job["pipeline"].provider, job["api_key"], repair_request(job["request"], sql_query, error))
+
+    def on_repair(name, completion):
+        run = runs[name]
+        run["repair_seconds"] = completion["seconds"]
+        if completion["error"]:
+            show(name, completion["error"], error=True)
+            run["repaired"] = False
+            start_query(name, run["sql_query"])
+            return
+        pipeline = jobs[name]["pipeline"]
+        sql_query = pipeline.extract_sql(completion["content"])
+        if sections:
+            with sections[name]:
+                run["repaired"] = check_repair(pipeline.model, pipeline.strategy, sql_query)
+        else:
+            run["repaired"] = validate_sql(sql_query) is None
+        start_query(name, sql_query)
+
+    for name, job in jobs.items():
+        runs[name] = {"sql_query": None, "generated": "request" in job, "generation_seconds": None, "bind_error": None,
+                      "repaired": None, "repair_seconds": None, "error": None, "query": None}
+        if "request" in job:
+            generate_jobs[name] = (job["pipeline"].provider, job["api_key"], job["request"])
+        else:
+            start_query(name, job["sql_query"])
+    try:
+        complete_all(generate_jobs, on_complete=on_sql, timeout=llm_timeout, concurrency=concurrency)
+        complete_all(repair_jobs, on_complete=on_repair, timeout=llm_timeout, concurrency=concurrency)
+    except BaseException:
+        # A rerun stops the script during the calls; the queries started so far are stopped with it
+        cancel_all(runs)
+        raise
+    return runs
+
+
+def cancel_all(runs):
+    """Stop the queries started by start_all that are still waiting or running."""
+    for run in runs.values():
+        if run["query"] is not None:
+            cancel_query(run["query"])
@@ -1,78 +1,291 @@
 import streamlit as st
 import json
 import os
+import sqlite3
+import threading
+import time
+import uuid
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
-# Path to prompts file
+from result_cache import unique_columns
+
+# Path to the prompt history database
+HISTORY_FILE = 'prompts.sqlite'
+
+# Directory holding the saved query results, one Parquet file per entry
+RESULTS_DIR = 'prompt_results'
+
+# Limits on the stored part of a query result; the row count of the full result is kept either way
+MAX_STORED_ROWS = 10000
+MAX_STORED_BYTES = 32 * 1024 * 1024
+
+# Number of entries shown per page on the Saved Prompts page
+PROMPTS_PER_PAGE = 10
+
+# Path to the legacy prompts file, imported into the history database once
 PROMPTS_FILE = 'prompts.json'
 
-def load_prompts():
-    """Load prompts from a JSON file."""
-    if os.path.exists(PROMPTS_FILE):
-        with open(PROMPTS_FILE, 'r') as f:
-            return json.load(f)
-    return {"gpt3.5_zero_shot": [], "gpt3.5_one_shot": [], "gpt3.5_two_shot": [], "gpt4_zero_shot": [], "gpt4_one_shot": [], "gpt4_two_shot": [], "llama_zero_shot": [], "llama_one_shot": []}
+# Categories of saved prompts, one per model and prompting strategy
+CATEGORIES = ["gpt3.5_zero_shot", "gpt3.5_one_shot", "gpt3.5_two_shot", "gpt4_zero_shot", "gpt4_one_shot", "gpt4_two_shot", "llama_zero_shot", "llama_one_shot"]
+
+# Columns describing where and how a result was stored
+RESULT_COLUMNS = {"error": "TEXT", "results_file": "TEXT", "row_count": "INTEGER", "results_bytes": "INTEGER", "truncated": "INTEGER"}
 
-def save_prompts(prompts):
-    """Save prompts to a JSON file."""
-    with open(PROMPTS_FILE, 'w') as f:
-        json.dump(prompts, f, indent=4)
 
-def display_results(results):
-    """Display results as a table if possible."""
+def spill_results(results):
+    """Write a query result to a compressed Parquet file and describe it for the history record.
+
+    Error messages are kept in the record itself. Results beyond the row or
+    byte limit are cut, and the record notes that they were truncated.
+    """
+    if results is None:
+        return {}
+    if isinstance(results, str):
+        return {"error": results}
     if isinstance(results, dict):
-        df = pd.DataFrame(results)
-        st.dataframe(df)
-    else:
-        st.write(results)
+        results = pd.DataFrame(results)
+    if results.columns.duplicated().any():
+        results = results.set_axis(unique_columns(results.columns), axis=1)
+    try:
+        table = pa.Table.from_pandas(results, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Columns mixing types, as in some old prompts.json results, are stored as text
+        table = pa.Table.from_pandas(results.astype(str), preserve_index=False)
+    row_count = table.num_rows
+    stored_rows = min(row_count, MAX_STORED_ROWS)
+    if table.nbytes > MAX_STORED_BYTES:
+        stored_rows = min(stored_rows, int(row_count * MAX_STORED_BYTES / table.nbytes))
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{uuid.uuid4().hex}.parquet")
+    pq.write_table(table.slice(0, stored_rows), path, compression='zstd')
+    return {"results_file": path, "row_count": row_count, "results_bytes": os.path.getsize(path),
+            "truncated": stored_rows < row_count}
+
+
+def load_results(entry):
+    """Read the stored result of a history entry, or None if it has none."""
+    if not entry.get("results_file") or not os.path.exists(entry["results_file"]):
+        return None
+    return pq.read_table(entry["results_file"]).to_pandas()
+
+
+def _remove_files(paths):
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+class PromptHistory:
+    """Append-only SQLite store of saved prompts; adding and deleting an entry touch only that row.
+
+    Query results are stored out of line as Parquet files referenced by the row.
+    """
+
+    def __init__(self, path=HISTORY_FILE):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS prompts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                category TEXT NOT NULL,
+                prompt TEXT,
+                sql_query TEXT,
+                results TEXT,
+                summary TEXT,
+                created_at REAL
+            )
+        """)
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(prompts)")}
+        for column, column_type in RESULT_COLUMNS.items():
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE prompts ADD COLUMN {column} {column_type}")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS prompts_category ON prompts (category, id)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+        self._spill_inline_results()
+
+    def _spill_inline_results(self):
+        """Move results that earlier versions stored as JSON in the row out to Parquet files."""
+        with self.lock:
+            rows = self.conn.execute("SELECT id, results FROM prompts WHERE results IS NOT NULL").fetchall()
+            for prompt_id, results in rows:
+                spilled = spill_results(json.loads(results))
+                self.conn.execute(
+                    "UPDATE prompts SET results = NULL, error = ?, results_file = ?, row_count = ?, results_bytes = ?, "
+                    "truncated = ? WHERE id = ?",
+                    tuple(spilled.get(column) for column in RESULT_COLUMNS) + (prompt_id,))
+            self.conn.commit()
+
+    def _insert(self, category, entry):
+        spilled = spill_results(entry.get("results"))
+        return self.conn.execute(
+            "INSERT INTO prompts (category, prompt, sql_query, summary, created_at, error, results_file, row_count, "
+            "results_bytes, truncated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (category, entry.get("prompt"), entry.get("sql_query"), entry.get("summary"), entry.get("created_at"))
+            + tuple(spilled.get(column) for column in RESULT_COLUMNS)).lastrowid
+
+    def add(self, category, entry):
+        """Append an entry to a category and return its id."""
+        with self.lock:
+            prompt_id = self._insert(category, entry)
+            self.conn.commit()
+            return prompt_id
+
+    def set_summary(self, prompt_id, summary):
+        """Store a summary that was generated after its entry was saved."""
+        with self.lock:
+            self.conn.execute("UPDATE prompts SET summary = ? WHERE id = ?", (summary, prompt_id))
+            self.conn.commit()
+
+    def list(self, category, limit=None, offset=0, after_id=0):
+        """Return one page of a category's entries, most recent first, without loading their results.
+
+        Only entries added after the entry with id `after_id` are returned.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, prompt, sql_query, summary, created_at, error, results_file, row_count, results_bytes, "
+                "truncated FROM prompts WHERE category = ? AND id > ? ORDER BY id DESC LIMIT ? OFFSET ?",
+                (category, after_id, -1 if limit is None else limit, offset)).fetchall()
+        keys = ["id", "prompt", "sql_query", "summary", "created_at"] + list(RESULT_COLUMNS)
+        return [dict(zip(keys, row)) for row in rows]
+
+    def count(self, category):
+        with self.lock:
+            return self.conn.execute("SELECT count(*) FROM prompts WHERE category = ?", (category,)).fetchone()[0]
+
+    def counts(self):
+        """Return the number of entries of every category, answered from the category index."""
+        with self.lock:
+            counts = dict(self.conn.execute("SELECT category, count(*) FROM prompts GROUP BY category").fetchall())
+        return {category: counts.get(category, 0) for category in CATEGORIES}
+
+    def delete(self, prompt_id):
+        with self.lock:
+            paths = [row[0] for row in self.conn.execute("SELECT results_file FROM prompts WHERE id = ?", (prompt_id,))]
+            self.conn.execute("DELETE FROM prompts WHERE id = ?", (prompt_id,))
+            self.conn.commit()
+        _remove_files(paths)
+
+    def clear(self):
+        with self.lock:
+            paths = [row[0] for row in self.conn.execute("SELECT results_file FROM prompts")]
+            self.conn.execute("DELETE FROM prompts")
+            self.conn.commit()
+        _remove_files(paths)
+
+    def version(self, category=None):
+        """Identify the content of the store, or of one category; it changes whenever an entry is added or deleted."""
+        with self.lock:
+            if category is None:
+                return self.conn.execute("SELECT max(id), count(*) FROM prompts").fetchone()
+            return self.conn.execute("SELECT max(id), count(*) FROM prompts WHERE category = ?", (category,)).fetchone()
+
+    def migrate_json(self, path=PROMPTS_FILE):
+        """Import the entries of the legacy prompts file once, in a single transaction, keeping their order."""
+        imported = 0
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_json'").fetchone():
+                return imported
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    prompts = json.load(f)
+                for category, prompt_list in prompts.items():
+                    for item in prompt_list:
+                        self._insert(category, item if isinstance(item, dict) else {"prompt": item})
+                        imported += 1
+            self.conn.execute("INSERT INTO meta VALUES ('migrated_json', ?)", (str(time.time()),))
+            self.conn.commit()
+        return imported
+
+
+@st.cache_resource
+def get_history():
+    """Open the prompt history once per process, importing prompts.json on first use."""
+    history = PromptHistory()
+    history.migrate_json()
+    return history
+
+
+def add_prompt(category, entry):
+    """Save a prompt with its SQL query, results and summary."""
+    return get_history().add(category, dict(entry, created_at=time.time()))
+
+
+def display_results(entry):
+    """Display the stored result of an entry as a table, or its error message."""
+    if entry.get("error"):
+        st.write(entry["error"])
+        return
+    results = load_results(entry)
+    if results is None:
+        st.write("No results")
+        return
+    st.dataframe(results)
+    if entry.get("truncated"):
+        st.caption(f"Showing the first {len(results)} of {entry['row_count']} rows.")
+
+def format_timestamp(created_at):
+    """Format the time an entry was saved; entries imported from prompts.json have none."""
+    if created_at is None:
+        return "unknown"
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(created_at))
 
 def prompts_page():
     st.title("Prompt Saver")
 
-    # Load existing prompts from the JSON file
-    prompts = load_prompts()
-    
+    history = get_history()
+
     st.subheader("Saved Prompts")
-    
+
     # Refresh button to reload prompts
-    if st.button('Refresh'):
-        prompts = load_prompts()
-
-    # Display each category of prompts
-    for category, prompt_list in prompts.items():
-        with st.expander(f"{category.capitalize()} Prompts", expanded=False):
-            if not prompt_list:
-                st.write("No prompts saved.")
-            else:
-                # Reverse the list to display the most recent prompts first
-                prompt_list = prompt_list[::-1]
-                for idx, item in enumerate(prompt_list):
-                    st.write(f"### Prompt {idx + 1}")
-                    if isinstance(item, str):  
-                        st.write(item)
-                    elif isinstance(item, dict):  
-                        st.write(f"**Prompt:** {item.get('prompt', 'N/A')}")
-                        st.write(f"**SQL Query:** {item.get('sql_query', 'N/A')}")
-                        st.write(f"**Results:**")
-                        results = item.get('results', 'No results')
-                        display_results(results)
-                        st.write(f"**Summary:** {item.get('summary', 'N/A')}")
+    st.button('Refresh')
+
+    # Only one page of one category is read, so the page costs the same however long the history grows
+    counts = history.counts()
+    category = st.selectbox("Category", CATEGORIES, format_func=lambda c: f"{c.capitalize()} Prompts ({counts[c]})")
+    pages = max(1, -(-counts[category] // PROMPTS_PER_PAGE))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"page_{category}")
+    offset = (page - 1) * PROMPTS_PER_PAGE
+    prompt_list = history.list(category, limit=PROMPTS_PER_PAGE, offset=offset)
+
+    if not prompt_list:
+        st.write("No prompts saved.")
+    else:
+        # Summary index of the page, most recent first
+        st.dataframe(pd.DataFrame({
+            "Prompt": [offset + idx + 1 for idx in range(len(prompt_list))],
+            "Text": [item.get('prompt') or 'N/A' for item in prompt_list],
+            "Saved at": [format_timestamp(item.get('created_at')) for item in prompt_list],
+            "Rows": [item.get('row_count') for item in prompt_list],
+        }), hide_index=True)
+
+        # Each entry's result file is only read while its expander is open
+        for idx, item in enumerate(prompt_list):
+            expander = st.expander(f"Prompt {offset + idx + 1}: {item.get('prompt') or 'N/A'}", key=f"prompt_{item['id']}", on_change="rerun")
+            if not expander.open:
+                continue
+            with expander:
+                st.write(f"**Prompt:** {item.get('prompt') or 'N/A'}")
+                st.write(f"**SQL Query:** {item.get('sql_query') or 'N/A'}")
+                st.write(f"**Results:**")
+                display_results(item)
+                st.write(f"**Summary:** {item.get('summary') or 'N/A'}")
 
     # Button to clear all saved prompts
     if st.button('Clear All Prompts'):
-        prompts = {"gpt3.5_zero_shot": [], "gpt3.5_one_shot": [], "gpt3.5_two_shot": [], "gpt4_zero_shot": [], "gpt4_one_shot": [], "gpt4_two_shot": [], "llama_zero_shot": [], "llama_one_shot": []}
-        save_prompts(prompts)
+        history.clear()
         st.success("All prompts cleared.")
 
-    # Enable individual prompt deletion
+    # Enable individual prompt deletion from the current page
     if st.checkbox("Enable individual prompt deletion by number"):
-        category = st.selectbox("Select category to delete from", list(prompts.keys()))
-        if prompts[category]:
-            prompt_indices = list(range(len(prompts[category])))
-            prompt_to_delete_index = st.selectbox("Select prompt number to delete", prompt_indices, format_func=lambda x: f"Prompt {x + 1}")
+        if prompt_list:
+            prompt_to_delete_index = st.selectbox("Select prompt number to delete", list(range(len(prompt_list))), format_func=lambda x: f"Prompt {offset + x + 1}")
             if st.button("Delete Selected Prompt"):
-                prompts[category].pop(prompt_to_delete_index)
-                save_prompts(prompts)
+                history.delete(prompt_list[prompt_to_delete_index]["id"])
                 st.success("Prompt deleted.")
         else:
             st.write("No prompts to delete.")
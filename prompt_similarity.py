@@ -0,0 +1,176 @@
+import hashlib
+import math
+import re
+import threading
+
+import numpy as np
+import streamlit as st
+
+from prompt_saver import CATEGORIES, get_history
+from schema_pruning import tokenize
+
+# Number of hashed feature dimensions of a prompt vector
+VECTOR_SIZE = 2 ** 11
+
+# Minimum cosine similarity for an earlier prompt to count as the same question
+SIMILARITY_THRESHOLD = 0.9
+
+# Paraphrases mapped to one canonical word, after stemming
+CANONICAL_WORDS = {
+    "article": "paper",
+    "publication": "paper",
+    "number": "count",
+    "total": "count",
+    "amount": "count",
+    "mentioning": "mention",
+    "mentioned": "mention",
+    "contain": "mention",
+    "containing": "mention",
+    "discuss": "mention",
+    "discussing": "mention",
+    "writer": "author",
+    "researcher": "author",
+}
+
+# Connecting words that do not change what is asked for
+IGNORED_WORDS = {"per", "get", "find", "display", "return", "please", "i", "want", "need", "know", "tell"}
+
+
+def _words(prompt):
+    words = []
+    for word in tokenize(prompt):
+        if word in IGNORED_WORDS:
+            continue
+        words.append(CANONICAL_WORDS.get(word, word))
+    return words
+
+
+def _features(prompt):
+    """Words and word pairs of a prompt; pairs keep some of the word order."""
+    words = _words(prompt)
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+def _bucket(feature):
+    # Python's hash() is salted per process, so a stable digest is used instead
+    return int.from_bytes(hashlib.md5(feature.encode('utf-8')).digest()[:4], 'little') % VECTOR_SIZE
+
+
+def _literals(prompt):
+    """Numbers and quoted phrases, which must match exactly for SQL to be reusable."""
+    return frozenset(re.findall(r"\d+|'[^']*'|\"[^\"]*\"", prompt.lower()))
+
+
+class PromptIndex:
+    """Nearest-neighbour index over earlier prompts, using hashed word vectors weighted by IDF.
+
+    The vectors are kept sparse, as the buckets and word counts of each
+    prompt, and the IDF weights are applied when searching. Adding a prompt
+    therefore costs time in proportion to its length, not to the index.
+    """
+
+    def __init__(self, entries=()):
+        self.entries = []
+        self.rows_by_words = {}
+        self.document_frequency = np.zeros(VECTOR_SIZE, dtype=np.float32)
+        # Row, bucket and count of every nonzero entry, in chunks joined on the next search
+        self.chunks = []
+        self.sparse = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry):
+        """Add a prompt; an entry asking the same words replaces the earlier one."""
+        words = " ".join(_words(entry["prompt"]))
+        if words in self.rows_by_words:
+            self.entries[self.rows_by_words[words]] = entry
+            return
+        row = len(self.entries)
+        self.rows_by_words[words] = row
+        self.entries.append(entry)
+        buckets, counts = np.unique(np.array([_bucket(feature) for feature in _features(entry["prompt"])],
+                                             dtype=np.int64), return_counts=True)
+        self.document_frequency[buckets] += 1
+        self.chunks.append((np.full(len(buckets), row, dtype=np.int64), buckets, counts.astype(np.float32)))
+
+    def _sparse(self):
+        if self.chunks:
+            self.sparse = tuple(np.concatenate([part] + [chunk[i] for chunk in self.chunks])
+                                for i, part in enumerate(self.sparse))
+            self.chunks = []
+        return self.sparse
+
+    def _idf(self):
+        return np.log((1 + len(self.entries)) / (1 + self.document_frequency)) + 1
+
+    def vectorize(self, prompt, idf=None):
+        vector = np.zeros(VECTOR_SIZE, dtype=np.float32)
+        np.add.at(vector, [_bucket(feature) for feature in _features(prompt)], 1)
+        vector *= self._idf() if idf is None else idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def nearest(self, prompt, threshold=SIMILARITY_THRESHOLD):
+        """Return (entry, similarity) of the closest earlier prompt above the threshold, or None."""
+        if not self.entries:
+            return None
+        rows, buckets, counts = self._sparse()
+        idf = self._idf()
+        weights = counts * idf[buckets]
+        norms = np.sqrt(np.bincount(rows, weights ** 2, minlength=len(self.entries)))
+        dots = np.bincount(rows, weights * self.vectorize(prompt, idf)[buckets], minlength=len(self.entries))
+        similarities = dots / np.where(norms == 0, 1, norms)
+        literals = _literals(prompt)
+        for row in np.argsort(-similarities):
+            similarity = float(similarities[row])
+            if similarity < threshold or math.isnan(similarity):
+                return None
+            if _literals(self.entries[row]["prompt"]) == literals:
+                return self.entries[row], similarity
+        return None
+
+
+def _reusable(entry):
+    """Only entries whose SQL ran without an error are worth reusing."""
+    return entry.get("prompt") and entry.get("sql_query") and not entry.get("error")
+
+
+@st.cache_resource
+def _get_index(category):
+    """Keep one index per prompt category for the life of the process, with the history version it reflects."""
+    return {"index": PromptIndex(), "version": (None, 0), "lock": threading.Lock()}
+
+
+def _current_index(category):
+    """Bring a category's index up to date with the history and return it.
+
+    Entries added since the last lookup are appended. The index is only
+    rebuilt when entries were deleted, and entries of other categories
+    never touch it.
+    """
+    history = get_history()
+    state = _get_index(category)
+    with state["lock"]:
+        version = history.version(category)
+        if tuple(version) == state["version"]:
+            return state["index"]
+        last_id, count = state["version"]
+        entries = history.list(category, after_id=last_id or 0)
+        if count + len(entries) != version[1]:
+            entries = history.list(category)
+            state["index"], count = PromptIndex(), 0
+        for entry in reversed(entries):
+            if _reusable(entry):
+                state["index"].add(entry)
+        count += len(entries)
+        if entries:
+            last_id = entries[0]["id"]
+        state["version"] = (last_id if count else None, count)
+        return state["index"]
+
+
+def find_similar_prompt(category, prompt, threshold=SIMILARITY_THRESHOLD):
+    """Return (entry, similarity) for a saved prompt of this category that asks the same question, or None."""
+    if category not in CATEGORIES:
+        return None
+    return _current_index(category).nearest(prompt, threshold)
@@ -0,0 +1,220 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+from db_connection import database_version, get_cursor
+
+# Maximum memory held by cached query results
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Rows returned by a query unless more are asked for
+RESULT_ROW_LIMIT = 1000
+
+# Arrow data read for a single result at most, whatever the row limit
+RESULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Rows per record batch when streaming a result
+RESULT_BATCH_ROWS = 2048
+
+# Seconds a query may run before it is interrupted
+QUERY_TIMEOUT = 30
+
+# Functions whose result changes between runs; queries calling them are never cached
+NONDETERMINISTIC_FUNCTIONS = ["random", "uuid", "gen_random_uuid", "now", "current_date", "current_time",
+                              "current_timestamp", "get_current_time", "get_current_timestamp", "setseed"]
+
+# String literals, quoted identifiers and comments are matched first so they are never rewritten
+_SQL_TOKENS = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*|/\*.*?\*/)""", re.DOTALL)
+
+
+def canonicalize_sql(sql_query):
+    """Rewrite SQL so that formatting differences do not matter.
+
+    Comments and the trailing semicolon are dropped, whitespace is collapsed
+    and everything outside literals and quoted identifiers is lower-cased.
+    """
+    # Alternate code and literal segments; comments become whitespace in the surrounding code
+    segments = [""]
+    for i, part in enumerate(_SQL_TOKENS.split(sql_query)):
+        if i % 2 == 0:
+            segments[-1] += part
+        elif part.startswith("--") or part.startswith("/*"):
+            segments[-1] += " "
+        else:
+            segments += [part, ""]
+    parts = []
+    for i, segment in enumerate(segments):
+        if i % 2 == 0:
+            segment = re.sub(r"\s+", " ", segment.lower())
+            segment = re.sub(r"\s*([(),;=<>+*/-])\s*", r"\1", segment)
+        parts.append(segment)
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def unique_columns(columns):
+    """Number repeated column names, as from SELECT * over a join, so that Arrow accepts them: id, id_1, id_2."""
+    names = []
+    for column in map(str, columns):
+        name, number = column, 0
+        while name in names:
+            number += 1
+            name = f"{column}_{number}"
+        names.append(name)
+    return names
+
+
+def fingerprint_sql(sql_query):
+    """Hash the canonical form of a SQL query."""
+    return hashlib.sha256(canonicalize_sql(sql_query).encode('utf-8')).hexdigest()
+
+
+def is_deterministic(sql_query):
+    """Tell whether running the query twice on the same database gives the same result."""
+    canonical = canonicalize_sql(sql_query)
+    return not any(re.search(rf"\b{name}\b", canonical) for name in NONDETERMINISTIC_FUNCTIONS)
+
+
+class ResultCache:
+    """In-memory LRU cache of Arrow tables with a cap on their total size.
+
+    Each entry also records whether the table was cut short, so that a request
+    for more rows than a cut table holds runs the query again.
+    """
+
+    def __init__(self, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.tables = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return (table, truncated) for a key, or None."""
+        with self.lock:
+            entry = self.tables.get(key)
+            if entry is not None:
+                self.tables.move_to_end(key)
+            return entry
+
+    def put(self, key, table, truncated=False):
+        """Cache a table, evicting the least recently used ones until it fits; oversized tables are skipped."""
+        if table.nbytes > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.tables:
+                self.nbytes -= self.tables.pop(key)[0].nbytes
+            while self.tables and self.nbytes + table.nbytes > self.max_bytes:
+                _, (evicted, _) = self.tables.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+            self.tables[key] = (table, truncated)
+            self.nbytes += table.nbytes
+
+
+@st.cache_resource
+def get_result_cache():
+    """Create the result cache once per process, shared by all sessions."""
+    return ResultCache()
+
+
+def fetch_bounded(sql_query, max_rows=RESULT_ROW_LIMIT, max_bytes=RESULT_MAX_BYTES, timeout=QUERY_TIMEOUT):
+    """Execute SQL on this thread's cursor and read at most max_rows rows and about max_bytes of Arrow data.
+
+    The result is streamed in record batches and reading stops at the limit,
+    so a query over a whole table never materializes more than the limit.
+    The query is interrupted once it has run for `timeout` seconds, which
+    raises duckdb.InterruptException. Returns the Arrow table and why it was
+    cut short: "rows", "bytes" or None.
+    """
+    cursor = get_cursor()
+    timer = threading.Timer(timeout, cursor.interrupt)
+    timer.start()
+    try:
+        return _read_bounded(cursor, sql_query, max_rows, max_bytes)
+    finally:
+        timer.cancel()
+
+
+def _read_bounded(cursor, sql_query, max_rows, max_bytes):
+    cursor.execute(sql_query)
+    if hasattr(cursor, 'to_arrow_reader'):
+        reader = cursor.to_arrow_reader(RESULT_BATCH_ROWS)
+    else:
+        reader = cursor.fetch_record_batch(RESULT_BATCH_ROWS)
+    batches = []
+    rows = 0
+    nbytes = 0
+    truncated = None
+    for batch in reader:
+        if batch.num_rows == 0:
+            continue
+        if rows >= max_rows:
+            truncated = "rows"
+            break
+        if rows + batch.num_rows > max_rows:
+            batch = batch.slice(0, max_rows - rows)
+            truncated = "rows"
+        if batches and nbytes + batch.nbytes > max_bytes:
+            truncated = "bytes"
+            break
+        batches.append(batch)
+        rows += batch.num_rows
+        nbytes += batch.nbytes
+        if truncated:
+            break
+    # Closing the reader abandons the rest of the query
+    reader.close()
+    if not batches:
+        return reader.schema.empty_table(), truncated
+    return pa.Table.from_batches(batches), truncated
+
+
+def run_query(sql_query, max_rows=RESULT_ROW_LIMIT, timeout=QUERY_TIMEOUT):
+    """Execute SQL and return at most max_rows rows as an Arrow table, with the reason it was cut short or None.
+
+    Results are cached by the query's canonical fingerprint and the database
+    version, so the same query from another page or rerun is not run again.
+    A cached result is reused for a larger limit only if it holds enough rows.
+    """
+    if not is_deterministic(sql_query):
+        return fetch_bounded(sql_query, max_rows, timeout=timeout)
+    key = (fingerprint_sql(sql_query), database_version())
+    cache = get_result_cache()
+    entry = cache.get(key)
+    if entry is not None:
+        table, truncated = entry
+        if not truncated or truncated == "bytes" or table.num_rows >= max_rows:
+            return table.slice(0, max_rows), "rows" if table.num_rows > max_rows else truncated
+    table, truncated = fetch_bounded(sql_query, max_rows, timeout=timeout)
+    cache.put(key, table, truncated)
+    return table, truncated
+
+
+def execute_sql(sql_query, max_rows=RESULT_ROW_LIMIT, timeout=QUERY_TIMEOUT):
+    """Execute the generated SQL query on the DuckDB database and return a DataFrame, or an error message.
+
+    The DataFrame holds at most max_rows rows; attrs["truncated"] tells whether
+    and why the result was cut short.
+    """
+    try:
+        table, truncated = run_query(sql_query, max_rows, timeout)
+    except duckdb.InterruptException:
+        return f"The query was stopped after running for {timeout} seconds."
+    except duckdb.CatalogException as e:
+        return f"Catalog error: {e}"
+    except duckdb.ParserException as e:
+        return f"Syntax error in SQL query: {e}"
+    except duckdb.BinderException as e:
+        return f"Binder error: {e}"
+    except Exception as e:
+        return f"An unexpected error occurred: {e}"
+    if len(set(table.column_names)) < table.num_columns:
+        table = table.rename_columns(unique_columns(table.column_names))
+    # Arrow-backed columns share the table's buffers, so st.dataframe turns them back into Arrow without a copy
+    result_df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    result_df.attrs["truncated"] = truncated
+    return result_df
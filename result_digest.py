@@ -0,0 +1,87 @@
+import duckdb
+import numpy as np
+
+from schema_catalog import CHARS_PER_TOKEN
+
+# Tokens of result data sent to the model for a summary
+SUMMARY_TOKEN_BUDGET = 1500
+
+# Most frequent values listed for each text column
+SUMMARY_TOP_VALUES = 5
+
+# Rows sampled from a result that is too large to send whole
+SUMMARY_SAMPLE_ROWS = 20
+
+# Longest text shown for a single value in the digest
+SUMMARY_MAX_VALUE_CHARS = 80
+
+# Columns of DuckDB's SUMMARIZE output that are sent to the model
+SUMMARY_STAT_COLUMNS = ["column_name", "column_type", "min", "max", "approx_unique", "avg", "null_percentage"]
+
+
+def _clip(value):
+    text = str(value)
+    if len(text) > SUMMARY_MAX_VALUE_CHARS:
+        return text[:SUMMARY_MAX_VALUE_CHARS] + "..."
+    return text
+
+
+def _quote(column):
+    return '"' + str(column).replace('"', '""') + '"'
+
+
+def _statistics(conn, results):
+    """Describe every column with DuckDB's SUMMARIZE and list the most frequent values of text columns."""
+    lines = []
+    stats = conn.execute("SUMMARIZE results").df()
+    stats = stats[[column for column in SUMMARY_STAT_COLUMNS if column in stats.columns]]
+    lines.append("Column statistics:\n" + stats.map(_clip).to_string(index=False))
+    for _, row in stats.iterrows():
+        if row["column_type"] != "VARCHAR" or row["approx_unique"] >= len(results):
+            continue
+        top = conn.execute(
+            f"SELECT {_quote(row['column_name'])} AS value, count(*) AS n FROM results "
+            f"GROUP BY 1 ORDER BY n DESC, value LIMIT {SUMMARY_TOP_VALUES}").fetchall()
+        values = ", ".join(f"{_clip(value)} ({n})" for value, n in top)
+        lines.append(f"Most frequent values of {row['column_name']}: {values}")
+    return lines
+
+
+def _sample(results, size):
+    """Pick rows spread evenly over the result, keeping their order, with long values clipped."""
+    positions = np.unique(np.linspace(0, len(results) - 1, num=min(size, len(results))).astype(int))
+    return results.iloc[positions].map(_clip).to_string(index=False)
+
+
+def result_digest(results, token_budget=SUMMARY_TOKEN_BUDGET):
+    """Describe a query result for the summary prompt within a token budget.
+
+    Results that fit the budget are sent as they are. Larger ones are replaced
+    by their size, column statistics, the most frequent text values and a
+    sample of rows, which is made smaller until the digest fits.
+    """
+    budget = token_budget * CHARS_PER_TOKEN
+    full = results.to_string(index=False)
+    if len(full) <= budget:
+        return full
+
+    header = f"The result has {len(results)} rows and {len(results.columns)} columns."
+    if results.attrs.get("truncated"):
+        header = f"The result was cut to its first {len(results)} rows; they have {len(results.columns)} columns."
+    lines = [header]
+    try:
+        conn = duckdb.connect()
+        conn.register("results", results)
+        lines += _statistics(conn, results)
+    except duckdb.Error:
+        # Results with duplicate or unsupported columns are described by their sample alone
+        pass
+    digest = "\n\n".join(lines)
+
+    size = SUMMARY_SAMPLE_ROWS
+    while size > 0:
+        with_sample = f"{digest}\n\nSample of {min(size, len(results))} rows:\n{_sample(results, size)}"
+        if len(with_sample) <= budget:
+            return with_sample
+        size //= 2
+    return digest[:budget]
@@ -0,0 +1,128 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import streamlit as st
+
+from db_connection import get_cursor
+from result_cache import QUERY_TIMEOUT, RESULT_ROW_LIMIT, execute_sql, fingerprint_sql
+
+# Worker threads running queries for all sessions; each has its own cursor
+QUERY_WORKERS = 8
+
+# Seconds between checks of a running query for completion or cancellation
+QUERY_POLL_INTERVAL = 0.25
+
+
+@st.cache_resource
+def get_query_executor():
+    """Create the pool of query workers once per process."""
+    return ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix="query")
+
+
+def query_timeout():
+    """Return the query timeout chosen in the sidebar."""
+    return st.session_state.get('query_timeout', QUERY_TIMEOUT)
+
+
+def query_settings_sidebar():
+    st.sidebar.number_input("Query timeout (seconds)", min_value=1, value=QUERY_TIMEOUT, key='query_timeout')
+
+
+def _execute_in_worker(sql_query, max_rows, timeout, running):
+    # The cursor is published only while this query runs on it; the worker may run another session's query next
+    with running["lock"]:
+        running["cursor"] = get_cursor()
+    start = time.perf_counter()
+    try:
+        return execute_sql(sql_query, max_rows, timeout)
+    finally:
+        running["seconds"] = time.perf_counter() - start
+        with running["lock"]:
+            del running["cursor"]
+
+
+def submit_query(sql_query, max_rows=RESULT_ROW_LIMIT, timeout=None):
+    """Start executing SQL in a query worker and return the running query for wait_with_cancel.
+
+    The timeout defaults to the one chosen in the sidebar. Once the query is
+    done, running["seconds"] holds how long it ran in the worker.
+    """
+    if timeout is None:
+        timeout = query_timeout()
+    running = {"lock": threading.Lock()}
+    future = get_query_executor().submit(_execute_in_worker, sql_query, max_rows, timeout, running)
+    return future, running
+
+
+def cancel_query(query):
+    """Drop a query still waiting for a worker and interrupt a running one.
+
+    The worker cannot leave the query while the lock is held, so the interrupt
+    never reaches a query of another session on the same cursor.
+    """
+    future, running = query
+    if future.cancel():
+        return
+    with running["lock"]:
+        if "cursor" in running:
+            running["cursor"].interrupt()
+
+
+def wait_with_cancel(query, key):
+    """Wait for a running query while showing a button that cancels it.
+
+    The script thread keeps updating the elapsed time while it waits. A click
+    on the cancel button, or any other rerun of the page, stops the script at
+    that update, and the running query is then interrupted instead of being
+    left to finish in the background.
+    """
+    future, _ = query
+    cancel = st.empty()
+    status = st.empty()
+    cancel.button("Cancel query", key=f"{key}_cancel")
+    start = time.perf_counter()
+    try:
+        while True:
+            try:
+                return future.result(timeout=QUERY_POLL_INTERVAL)
+            except TimeoutError:
+                status.caption(f"Running query... {time.perf_counter() - start:.0f} s")
+    finally:
+        cancel_query(query)
+        cancel.empty()
+        status.empty()
+
+
+def execute_with_cancel(sql_query, key, max_rows=RESULT_ROW_LIMIT):
+    """Execute SQL in a query worker and wait for it with a cancel button, see wait_with_cancel."""
+    return wait_with_cancel(submit_query(sql_query, max_rows), key)
+
+
+def _set_limit(limit_key, limit):
+    st.session_state[limit_key] = limit
+
+
+@st.fragment
+def show_rows(sql_query, result, key):
+    """Show a query result and, if it was cut at the row limit, a button that loads more rows.
+
+    This runs as a fragment, so loading more rows reruns only the table and
+    not the SQL generation above it. Larger limits are served from the result
+    cache when an earlier run already read enough rows.
+    """
+    limit_key = f"{key}_row_limit_{fingerprint_sql(sql_query)[:16]}"
+    limit = st.session_state.get(limit_key, len(result))
+    if limit > len(result) and result.attrs.get("truncated") == "rows":
+        result = execute_sql(sql_query, max_rows=limit, timeout=query_timeout())
+        if isinstance(result, str):
+            st.error(result)
+            return
+    st.dataframe(result)
+    truncated = result.attrs.get("truncated")
+    if truncated == "rows":
+        st.caption(f"Showing the first {len(result)} rows.")
+        st.button("Load more rows", key=f"{key}_load_more", on_click=_set_limit,
+                  args=(limit_key, len(result) + RESULT_ROW_LIMIT))
+    elif truncated == "bytes":
+        st.caption(f"Showing the first {len(result)} rows; the rest of the result is too large to load.")
@@ -0,0 +1,240 @@
+import re
+
+import streamlit as st
+
+from db_connection import database_version, get_cursor
+from schema_pruning import SCHEMA_TOKEN_BUDGET, SCHEMA_TOP_K, SchemaIndex
+
+# Dictionary containing metadata about each table in the database, including the purpose of each table and descriptions of columns
+additional_info = {
+    "papers": {
+        "purpose": "Master Data of all papers in our database. One row is one paper.",
+        "columns": {
+            "article_id": "unique identifier for an article; used in many other tables as well; can be used for joining data with data from other tables",
+            "citekey": "Some tables only have a citekey and no article_id, then you can use the citeley to join the tables (stays the same though different runs)",
+            "abstract": "text paragraph with the complete abstract of a research article",
+            "journal_akronym": "abbreviation of the journal name",
+            "citation_count": "how often was the paper cited from papers in our database",
+        }
+    },
+    "sentences": {
+        "purpose": "All individual sentences of every paper in the database. one row is one sentence.",
+        "columns": {
+            "article_id": "can be used for joining with other tables",
+            "sentence_id": "unique sentence_id for each individual sentence",
+            "section_id": "Can be used to join with section table to get the name of the section name",
+            "last_section_title": "section name",
+            "last_subsection_title": "subsection name",
+            "section_nr": "section counter for each article (starts with 0 (or 1) for each article)",
+            "para_id": "can be used to join with paragraph table",
+            "sentence_type": "refers to different sections in the paper (abstract, etc.) but is not as detailed as last_section_title",
+            "sentence_original": "The text of the sentence",
+        }
+    },
+    "paragraphs": {
+        "purpose": "All individual paragraphs of every paper in the database. one row is one paragraph. one paragraph can have multiple sentences.",
+        "columns": {
+            "para_id": "unique para_id for each individual paragraph"
+        }
+    },
+    "entities": {
+        "purpose": "All individual entities from the ontology that we found in any paper of the database entity (see column 'entity', not 'ent_id'). One row is one appearance of an entity in an article. If 'survey' appears multiple times in a paper, we get multiple rows.",
+        "columns": {
+            "ent_id": "the ent_id from an entity in the IS Ontology, see",
+            "entity": "The synonym that was used in a text (not the direct name of an ent_id, but a synonym for an ent_id - see table synonyms), e.g. entity='platform strategy', ent_id='digital platform'",
+            "sentence": "modified sentence where we replaced acronyms with the full name"
+        }
+    },
+    "ontology": {
+        "purpose": "All individual ent_ids from the IS Ontology. one row is for one ent_id",
+        "columns": {
+            "ent_id": "that is a unique entity (key term) in the IS Ontology, e.g., survey, case study, etc.",
+            "definition": "definition for an ent_id (generated with GPT 4)",
+            "label": "top level descriptions of an ontology branch"
+        }
+    },
+    "citations": {
+        "purpose": "All individual citations from our database. If an author of an article cites another paper somewhere in the text, we create an entry in this table. one row is one individual citation",
+        "columns": {
+            "reference_citekey": "what article is cited? This is the citekey in table sources",
+            "paper_citekey": "links to table papers"
+        }
+    },
+    "sources": {
+        "purpose": "All individual sources that come from the reference section of papers in our database. one row is one source",
+        "columns": {
+            "citekey": "the reference_citekey from table citations",
+            "para_id": "unique para_id for each individual paragraph"
+        }
+    },
+    "authors": {
+        "purpose": "All authors of the papers in the database. One row is one author",
+        "columns": {
+            "author_position": "the position of the author in the author list",
+            "full_name": "full name of the author",
+            "institutions": "institution of the author",
+        }
+    },
+    "keywords": {
+        "purpose": "All individual keywords from the papers in the database. One row is one keyword",
+        "columns": {
+            "article_id": "the article_id which maps to table papers",
+            "keyword": "the keyword"
+        }
+    },
+    "subsections": {
+        "purpose": "All individual subsections of every paper in the database. One row is one subsection.",
+        "columns": {
+            "section_id": "unique section_id for each individual section",
+            "section_nr": "section counter for each article (starts with 0 (or 1) for each article)",
+            "section_title": "title of the section",
+            "subsection_title": "title of the subsection"
+        }
+    },
+    "synonyms": {
+        "purpose": "All synonyms for the ent_ids in the IS Ontology. One row is one synonym.",
+        "columns": {
+            "ent_id": "the ent_id from the IS Ontology",
+            "synonym": "a synonym for an ent_id"
+        }
+    }
+}
+
+
+# Rough number of characters per token, used to estimate prompt sizes without a tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def render_table(table, info):
+    """Render one table's purpose and columns as a line block of the schema prompt."""
+    columns = ', '.join([f'{col}: {desc}' for col, desc in info['columns'].items()])
+    return f"Table '{table}': Purpose: {info.get('purpose', 'N/A')}\nColumns: {columns}"
+
+
+def prompt_size(text):
+    """Report the size of a prompt fragment in characters, UTF-8 bytes and estimated tokens."""
+    return {
+        "chars": len(text),
+        "bytes": len(text.encode('utf-8')),
+        "approx_tokens": len(text) // CHARS_PER_TOKEN,
+    }
+
+
+class SchemaCatalog:
+    """Table and column metadata of one version of the database, merged with additional_info.
+
+    The schema block embedded in every SQL generation prompt is rendered once
+    here, so generation only has to look it up.
+    """
+
+    def __init__(self, version, schema_info):
+        self.version = version
+        self.schema_info = schema_info
+        self.table_fragments = {table: render_table(table, info) for table, info in schema_info.items()}
+        self.schema_prompt = "\n".join(self.table_fragments.values())
+        self.index = SchemaIndex(schema_info)
+
+    def pruned_prompt(self, question, top_k=SCHEMA_TOP_K, token_budget=SCHEMA_TOKEN_BUDGET):
+        """Render the schema block restricted to the tables relevant to the question, with their join keys.
+
+        Falls back to the full schema block when top_k is 0 or nothing in the question matches.
+        """
+        if not top_k:
+            return self.schema_prompt
+        tables = self.index.select(question, self.table_fragments, top_k, token_budget, CHARS_PER_TOKEN)
+        if not tables:
+            return self.schema_prompt
+        return self.subset_prompt(tables)
+
+    def subset_prompt(self, tables):
+        """Render the schema block of the given tables, in catalog order, with the join keys between them."""
+        lines = [fragment for table, fragment in self.table_fragments.items() if table in tables]
+        join_keys = self.index.join_keys(tables)
+        if join_keys:
+            lines.append(join_keys)
+        return "\n".join(lines)
+
+    def mentioned_tables(self, text):
+        """List the tables whose names appear as words in the text, such as a SQL query or an error message."""
+        words = set(re.findall(r"\w+", text.lower()))
+        return [table for table in self.table_fragments if table.lower() in words]
+
+    def prompt_report(self):
+        """Describe the size of the rendered schema block."""
+        report = prompt_size(self.schema_prompt)
+        report["tables"] = len(self.table_fragments)
+        report["version"] = self.version
+        return report
+
+
+@st.cache_resource(max_entries=1)
+def _build_catalog(version):
+    """Read every table's columns with a single information_schema query."""
+    rows = get_cursor().execute("""
+        SELECT table_name, column_name
+        FROM information_schema.columns
+        WHERE table_catalog = current_database() AND table_schema = current_schema()
+        ORDER BY table_name, ordinal_position
+    """).fetchall()
+    schema_info = {}
+    for table_name, column_name in rows:
+        schema_info.setdefault(table_name, {"columns": {}})["columns"][column_name] = ""
+    for table_name, info in schema_info.items():
+        if table_name in additional_info:
+            info["purpose"] = additional_info[table_name].get("purpose", "No purpose available")
+            info["columns"].update(additional_info[table_name].get("columns", {}))
+    return SchemaCatalog(version, schema_info)
+
+
+def get_schema_catalog():
+    """Return the catalog for the current database file; it is rebuilt only when the file changes."""
+    return _build_catalog(database_version())
+
+
+def fetch_schema_info():
+    """Return the schema information shared by all pages, or None if it cannot be read."""
+    try:
+        return get_schema_catalog().schema_info
+    except Exception as e:
+        st.error(f"Error fetching schema information: {e}")
+        return None
+
+
+def fetch_schema_prompt(question=None):
+    """Return the schema block to send with a question, or None if it cannot be read.
+
+    With a question, only the relevant tables are included, as configured in the sidebar.
+    """
+    try:
+        catalog = get_schema_catalog()
+    except Exception as e:
+        st.error(f"Error fetching schema information: {e}")
+        return None
+    if question is None:
+        return catalog.schema_prompt
+    schema_prompt = catalog.pruned_prompt(
+        question,
+        top_k=st.session_state.get('schema_top_k', SCHEMA_TOP_K),
+        token_budget=st.session_state.get('schema_token_budget', SCHEMA_TOKEN_BUDGET),
+    )
+    st.caption(
+        f"Schema sent to the model: ~{prompt_size(schema_prompt)['approx_tokens']} of "
+        f"~{prompt_size(catalog.schema_prompt)['approx_tokens']} tokens"
+    )
+    return schema_prompt
+
+
+def schema_settings_sidebar():
+    """Show the size of the full schema block and the schema pruning settings in the sidebar."""
+    try:
+        report = get_schema_catalog().prompt_report()
+    except Exception:
+        return
+    st.sidebar.caption(
+        f"Schema prompt: {report['tables']} tables, {report['bytes'] / 1024:.1f} KB, "
+        f"~{report['approx_tokens']} tokens (version {report['version']})"
+    )
+    st.sidebar.number_input("Tables sent to the model (0 = all)", min_value=0, max_value=report['tables'],
+                            value=min(SCHEMA_TOP_K, report['tables']), key='schema_top_k')
+    st.sidebar.number_input("Schema token budget", min_value=100, value=SCHEMA_TOKEN_BUDGET, step=100,
+                            key='schema_token_budget')
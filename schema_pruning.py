@@ -0,0 +1,208 @@
+import math
+import re
+from collections import Counter, deque
+
+# Default number of tables sent to the LLM and token budget for the schema block
+SCHEMA_TOP_K = 4
+SCHEMA_TOKEN_BUDGET = 1500
+
+# Tables that are always sent, since almost every question joins back to them; they count towards the top k
+ALWAYS_INCLUDE = ["papers"]
+
+# Columns that identify rows across tables and can be used to join them
+KEY_COLUMNS = ["article_id", "sentence_id", "para_id", "section_id", "ent_id", "citekey"]
+
+# Joins between columns whose names differ
+EXTRA_JOINS = [
+    ("citations", "paper_citekey", "papers", "citekey"),
+    ("citations", "reference_citekey", "sources", "citekey"),
+]
+
+# Words users ask with, mapped to the words the schema describes the same thing with
+QUERY_SYNONYMS = {
+    "article": ["paper"],
+    "publication": ["paper"],
+    "mention": ["sentence", "entity"],
+    "mentioned": ["sentence", "entity"],
+    "say": ["sentence"],
+    "text": ["sentence"],
+    "cite": ["citation"],
+    "cited": ["citation"],
+    "reference": ["source", "citation"],
+    "wrote": ["author"],
+    "written": ["author"],
+    "writer": ["author"],
+    "researcher": ["author"],
+    "university": ["institution", "author"],
+    "theory": ["entity", "ontology"],
+    "concept": ["entity", "ontology"],
+    "term": ["entity", "ontology", "synonym"],
+    "define": ["definition", "ontology"],
+    "chapter": ["section", "subsection"],
+    "heading": ["section", "subsection"],
+    "tag": ["keyword"],
+}
+
+# Words that carry no information about which table is meant, in questions or in the descriptions
+STOPWORDS = {
+    "a", "about", "all", "an", "and", "are", "as", "based", "be", "by", "can", "database", "do", "each",
+    "for", "from", "give", "how", "in", "individual", "is", "it", "list", "many", "me", "much", "of",
+    "on", "one", "or", "our", "row", "see", "show", "table", "that", "the", "their", "there", "this",
+    "to", "used", "we", "what", "which", "who", "with",
+}
+
+# Tables scoring below this fraction of the best table are not worth their tokens
+MIN_RELATIVE_SCORE = 0.25
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+
+def _stem(word):
+    """Strip plural endings so that 'papers' and 'paper' match."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Split text into lower-case stemmed words without stopwords; snake_case names are split into their parts."""
+    return [_stem(word) for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOPWORDS]
+
+
+def _table_document(table, info):
+    """Collect the words describing a table; names are repeated so they weigh more than descriptions."""
+    words = tokenize(table) * 3
+    for column, description in info["columns"].items():
+        words += tokenize(column) * 2
+        words += tokenize(description)
+    words += tokenize(info.get("purpose", ""))
+    return words
+
+
+class SchemaIndex:
+    """BM25 index over table names, column names and their descriptions."""
+
+    def __init__(self, schema_info):
+        self.schema_info = schema_info
+        self.documents = {table: Counter(_table_document(table, info)) for table, info in schema_info.items()}
+        self.lengths = {table: sum(counts.values()) for table, counts in self.documents.items()}
+        self.average_length = (sum(self.lengths.values()) / len(self.lengths)) if self.lengths else 0
+        document_frequency = Counter()
+        for counts in self.documents.values():
+            document_frequency.update(counts.keys())
+        total = len(self.documents)
+        self.idf = {
+            word: math.log(1 + (total - freq + 0.5) / (freq + 0.5))
+            for word, freq in document_frequency.items()
+        }
+        self.joins = self._find_joins()
+
+    def _find_joins(self):
+        """List the (table, column, table, column) pairs that can be joined."""
+        joins = []
+        tables = list(self.schema_info)
+        for i, left in enumerate(tables):
+            for right in tables[i + 1:]:
+                shared = set(self.schema_info[left]["columns"]) & set(self.schema_info[right]["columns"])
+                for column in KEY_COLUMNS:
+                    if column in shared:
+                        joins.append((left, column, right, column))
+        for left, left_column, right, right_column in EXTRA_JOINS:
+            if (left in self.schema_info and right in self.schema_info
+                    and left_column in self.schema_info[left]["columns"]
+                    and right_column in self.schema_info[right]["columns"]):
+                joins.append((left, left_column, right, right_column))
+        return joins
+
+    def score(self, question):
+        """Score every table against the question with BM25."""
+        words = []
+        for word in tokenize(question):
+            words.append(word)
+            words += QUERY_SYNONYMS.get(word, [])
+        scores = {}
+        for table, counts in self.documents.items():
+            norm = K1 * (1 - B + B * self.lengths[table] / self.average_length)
+            total = 0.0
+            for word in words:
+                freq = counts.get(word, 0)
+                if freq:
+                    total += self.idf[word] * freq * (K1 + 1) / (freq + norm)
+            scores[table] = total
+        return scores
+
+    def _neighbours(self, table):
+        for left, _, right, _ in self.joins:
+            if left == table:
+                yield right
+            elif right == table:
+                yield left
+
+    def _bridge(self, table, selected):
+        """Return the tables needed to join `table` to the selected ones, along the shortest path."""
+        previous = {table: None}
+        queue = deque([table])
+        while queue:
+            current = queue.popleft()
+            if current != table and current in selected:
+                path = []
+                current = previous[current]
+                while current is not None and current != table:
+                    path.append(current)
+                    current = previous[current]
+                return path
+            for neighbour in self._neighbours(current):
+                if neighbour not in previous:
+                    previous[neighbour] = current
+                    queue.append(neighbour)
+        return []
+
+    def select(self, question, fragments, top_k=SCHEMA_TOP_K, token_budget=SCHEMA_TOKEN_BUDGET, chars_per_token=4):
+        """Pick the most relevant tables for a question within the table count and token budget.
+
+        Tables needed to join a selected table to the others are added as well,
+        as long as they fit the token budget. Returns None when nothing in the
+        question matches the schema, so the caller can fall back to the full schema.
+        """
+        scores = self.score(question)
+        best = max(scores.values(), default=0)
+        if best <= 0:
+            return None
+        ranked = [table for table in sorted(scores, key=scores.get, reverse=True)
+                  if scores[table] >= best * MIN_RELATIVE_SCORE]
+        budget = token_budget * chars_per_token
+        selected = []
+        used = 0
+
+        def add(table):
+            nonlocal used
+            size = len(fragments[table])
+            if table not in selected and used + size <= budget:
+                selected.append(table)
+                used += size
+
+        for table in ALWAYS_INCLUDE:
+            if table in fragments:
+                add(table)
+        for table in ranked:
+            if len(selected) >= top_k:
+                break
+            add(table)
+        for table in list(selected):
+            for bridge_table in self._bridge(table, set(selected)):
+                add(bridge_table)
+        return selected
+
+    def join_keys(self, tables):
+        """Render the join conditions between the given tables."""
+        tables = set(tables)
+        conditions = [
+            f"{left}.{left_column} = {right}.{right_column}"
+            for left, left_column, right, right_column in self.joins
+            if left in tables and right in tables
+        ]
+        return "Join keys: " + "; ".join(conditions) if conditions else ""
@@ -0,0 +1,144 @@
+import re
+import sqlite3
+import threading
+import time
+
+import streamlit as st
+
+from db_connection import database_version
+from prompt_similarity import find_similar_prompt
+
+# Path to the on-disk cache of generated SQL queries
+SQL_CACHE_FILE = 'sql_cache.sqlite'
+
+# Cached SQL expires after this many seconds
+SQL_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Maximum number of cached queries; the least recently used ones are evicted first
+SQL_CACHE_MAX_ENTRIES = 1000
+
+# Prefix of the saved prompt categories for each model
+MODEL_CATEGORIES = {
+    "gpt-3.5-turbo": "gpt3.5",
+    "gpt-4": "gpt4",
+    "llama3-70b-8192": "llama",
+}
+
+
+def normalize_prompt(prompt):
+    """Lower-case a prompt, collapse its whitespace and drop trailing punctuation."""
+    prompt = re.sub(r"\s+", " ", prompt.lower()).strip()
+    return prompt.rstrip(" ?!.;")
+
+
+class SqlCache:
+    """SQLite-backed cache of generated SQL keyed by model, strategy, normalized prompt and schema version."""
+
+    def __init__(self, path=SQL_CACHE_FILE, ttl=SQL_CACHE_TTL, max_entries=SQL_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sql_cache (
+                model TEXT NOT NULL,
+                strategy TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                schema_version TEXT NOT NULL,
+                sql_query TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, strategy, prompt, schema_version)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS sql_cache_last_used ON sql_cache (last_used)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sql_repairs (
+                model TEXT NOT NULL,
+                strategy TEXT NOT NULL,
+                succeeded INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, model, strategy, prompt, schema_version):
+        """Return the cached SQL for a prompt, or None if it is missing or expired."""
+        key = (model, strategy, normalize_prompt(prompt), schema_version)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT sql_query, created_at FROM sql_cache "
+                "WHERE model = ? AND strategy = ? AND prompt = ? AND schema_version = ?", key).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self.conn.execute(
+                    "DELETE FROM sql_cache WHERE model = ? AND strategy = ? AND prompt = ? AND schema_version = ?", key)
+                self.conn.commit()
+                return None
+            self.conn.execute(
+                "UPDATE sql_cache SET last_used = ? "
+                "WHERE model = ? AND strategy = ? AND prompt = ? AND schema_version = ?", (now,) + key)
+            self.conn.commit()
+            return row[0]
+
+    def put(self, model, strategy, prompt, schema_version, sql_query):
+        """Store the SQL generated for a prompt and evict the least recently used entries beyond the limit."""
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sql_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (model, strategy, normalize_prompt(prompt), schema_version, sql_query, now, now))
+            self.conn.execute(
+                "DELETE FROM sql_cache WHERE rowid IN "
+                "(SELECT rowid FROM sql_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+            self.conn.commit()
+
+    def record_repair(self, model, strategy, succeeded):
+        """Log an automatic repair of SQL that failed validation."""
+        with self.lock:
+            self.conn.execute("INSERT INTO sql_repairs VALUES (?, ?, ?, ?)", (model, strategy, int(succeeded), time.time()))
+            self.conn.commit()
+
+    def repair_stats(self):
+        """Count the automatic repairs attempted and those that produced valid SQL."""
+        with self.lock:
+            attempted, succeeded = self.conn.execute("SELECT count(*), coalesce(sum(succeeded), 0) FROM sql_repairs").fetchone()
+        return {"attempted": attempted, "succeeded": succeeded}
+
+
+@st.cache_resource
+def get_sql_cache():
+    """Open the SQL cache once per process."""
+    return SqlCache()
+
+
+def lookup_sql(model, strategy, prompt):
+    """Return previously generated SQL for this prompt, if any.
+
+    Exact repeats for the current schema version are looked up first, then
+    paraphrases of the prompts saved for the same model and strategy. SQL
+    from a paraphrase is reused only if it still binds against the schema;
+    otherwise None is returned and the query is generated again.
+    """
+    sql_query = get_sql_cache().get(model, strategy, prompt, database_version())
+    if sql_query is not None:
+        st.caption("SQL query served from the cache.")
+        return sql_query
+    match = find_similar_prompt(f"{MODEL_CATEGORIES.get(model, model)}_{strategy}", prompt)
+    if match is None:
+        return None
+    # Imported here because sql_repair records its repairs in this module's cache
+    from sql_repair import validate_sql
+    entry, similarity = match
+    # Saved prompts are not tied to a schema version, so the query may no longer bind
+    if validate_sql(entry["sql_query"]) is not None:
+        return None
+    st.caption(f"SQL query reused from the saved prompt \"{entry['prompt']}\" (similarity {similarity:.2f}).")
+    return entry["sql_query"]
+
+
+def store_sql(model, strategy, prompt, sql_query):
+    """Remember SQL that executed successfully for this prompt and schema version."""
+    get_sql_cache().put(model, strategy, prompt, database_version(), sql_query)
@@ -0,0 +1,273 @@
+import re
+
+import streamlit as st
+
+# Keywords that start a new line in SQL generated by the GPT models
+LINE_BREAK_KEYWORDS = [" FROM ", " WHERE ", " JOIN ", " INNER JOIN ", " LEFT JOIN ", " RIGHT JOIN ", " ON ", " AND ", " OR ",
+                       " GROUP BY ", " ORDER BY ", " LIMIT "]
+
+# Words a line of SQL can start with; a line after a blank line starting with anything else is taken as prose
+SQL_WORDS = {
+    "select", "from", "where", "join", "inner", "left", "right", "full", "outer", "cross", "natural", "on", "using",
+    "and", "or", "not", "group", "order", "by", "having", "limit", "offset", "union", "intersect", "except", "with",
+    "as", "case", "when", "then", "else", "end", "in", "between", "like", "ilike", "is", "null", "distinct", "asc",
+    "desc", "qualify", "window", "over", "partition", "values", "exists", "all", "any",
+}
+
+# A line starting a query: SELECT, or WITH and the name and opening parenthesis of a common table expression
+QUERY_START = re.compile(r"""^[ \t]*(select\b(?!\Z)|with\s+(recursive\s+)?("[^"\n]+"|\w+)(\s*\([^()]*\))?\s+as\s*((not\s+)?materialized\s*)?\()""",
+                         re.IGNORECASE | re.MULTILINE)
+
+# Characters QUERY_START looks back over in text already scanned, in case a query start was split between chunks
+QUERY_START_LOOKBACK = 64
+
+# Characters ending a line after which the query always goes on, even past a blank line
+CONTINUATION_CHARS = ",(+-%=<>|"
+
+# String literals and quoted identifiers are matched first so that "--" inside them is kept
+_LINE_COMMENTS = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")|--[^\n]*""")
+
+
+def find_query_start(content):
+    """Return where the SQL query in a reply starts: at the first line starting one, or else at the first "select"."""
+    match = QUERY_START.search(content)
+    if match is not None:
+        return match.start(1)
+    return content.lower().find("select")
+
+
+def extract_gpt_sql(content):
+    """Cut a GPT reply down to its SQL query, starting at the first SELECT or WITH, and break it into lines."""
+    sql_query = content.strip()
+    sql_start = find_query_start(sql_query)
+    if sql_start != -1:
+        sql_query = sql_query[sql_start:]
+    sql_query = sql_query.strip()
+    # Line comments would swallow the rest of the query once the lines are joined
+    sql_query = _LINE_COMMENTS.sub(lambda match: match.group(1) or "", sql_query)
+    sql_query = sql_query.replace("\n", " ")
+    sql_query = sql_query.replace("`", "")
+    for keyword in LINE_BREAK_KEYWORDS:
+        sql_query = sql_query.replace(keyword, f"\n{keyword.strip()} ")
+    return sql_query
+
+
+def extract_llama_sql(content):
+    """Strip code fences and any non-SQL preamble from a Llama reply."""
+    sql_query = content.replace("```", "").strip()
+    match = QUERY_START.search(sql_query)
+    if match is not None:
+        return sql_query[match.start(1):]
+    lines = sql_query.split('\n')
+    for i, line in enumerate(lines):
+        if "SELECT" in line.upper():
+            sql_query = "\n".join(lines[i:])
+            break
+    return sql_query
+
+
+class SqlStream:
+    """Follow a streamed reply and find where the SQL query in it starts and ends.
+
+    The query starts after an opening code fence, or at a line starting with
+    SELECT or WITH when no fence comes before it; a reply without either is
+    searched for the first "select" once it is complete. The query ends at a
+    closing code fence, at a semicolon outside quotes and comments, or where
+    a blank line is followed by prose instead of more SQL. Only text that has
+    not been scanned yet is looked at, so each chunk costs time in proportion
+    to its own length.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.start = None
+        self.end = None
+        self.scanned = 0
+        self.finished = False
+        self.fenced = False
+        # The quote character of the string literal or identifier being scanned, if any
+        self.quote = None
+        self.line_start = 0
+        # Position of a blank line inside the query, until the line after it shows whether the query goes on
+        self.blank_line = None
+        # The last character of the query outside comments and whitespace
+        self.last_char = None
+
+    @property
+    def complete(self):
+        return self.end is not None
+
+    def feed(self, chunk):
+        """Add the next piece of the reply; text after the end of the query is ignored."""
+        if self.complete:
+            return
+        self.text += chunk
+        self._scan()
+
+    def _begin(self, position):
+        self.start = self.scanned = self.line_start = position
+        self.quote = None
+        self.blank_line = None
+        self.last_char = None
+
+    def _open_fence(self, fence):
+        """Start the query on the line after an opening code fence; False until that line has begun."""
+        newline = self.text.find("\n", fence)
+        if newline == -1:
+            return False
+        self.fenced = True
+        self._begin(newline + 1)
+        return True
+
+    def _find_start(self):
+        # Step back in case a query start or a fence was split between chunks
+        offset = max(0, self.scanned - QUERY_START_LOOKBACK)
+        match = QUERY_START.search(self.text, offset)
+        fence = self.text.find("```", offset)
+        if fence != -1 and (match is None or fence < match.start(1)):
+            if self._open_fence(fence):
+                return True
+            self.scanned = fence
+            return False
+        if match is None:
+            self.scanned = len(self.text)
+            return False
+        self._begin(match.start(1))
+        return True
+
+    def _scan(self):
+        if self.start is None and not self._find_start():
+            return
+        # Until the reply is complete, the last two characters wait for the next chunk, since they may begin a fence
+        stop = len(self.text) if self.finished else len(self.text) - 2
+        while self.scanned < stop:
+            if self.blank_line is not None:
+                prose = self._prose_follows()
+                if prose is None:
+                    return
+                if prose:
+                    self.end = self.blank_line
+                    return
+                self.blank_line = None
+            i = self.scanned
+            char = self.text[i]
+            if self.quote is not None:
+                if char == self.quote:
+                    self.quote = None
+            elif self.text.startswith("```", i):
+                # A fence after a "select" in the middle of a sentence opens the query instead of closing it
+                line = self.text[self.text.rfind("\n", 0, self.start) + 1:self.start]
+                if self.fenced or not line.strip():
+                    self.end = i
+                    return
+                if not self._open_fence(i):
+                    if self.finished:
+                        self.end = i
+                    return
+                continue
+            elif self.text.startswith("--", i) or self.text.startswith("/*", i):
+                if not self._skip_comment(i):
+                    return
+                continue
+            elif char in "'\"":
+                self.quote = char
+            elif char == ";":
+                self.end = i
+                return
+            elif char == "\n":
+                # A blank line after a comma or an operator is still inside the query
+                continues = self.last_char is not None and self.last_char in CONTINUATION_CHARS
+                if not continues and not self.text[self.line_start:i].strip():
+                    self.blank_line = self.line_start
+                self.line_start = i + 1
+            if self.quote is None and not char.isspace():
+                self.last_char = char
+            self.scanned += 1
+
+    def _skip_comment(self, i):
+        """Move past a comment starting at i, up to the newline ending a line comment; False until its end arrives."""
+        line_comment = self.text.startswith("--", i)
+        close = self.text.find("\n" if line_comment else "*/", i + 2)
+        if close == -1:
+            if not self.finished:
+                return False
+            close = len(self.text)
+        elif not line_comment:
+            newline = self.text.rfind("\n", i, close)
+            if newline != -1:
+                self.line_start = newline + 1
+            close += 2
+        self.scanned = close
+        return True
+
+    def _prose_follows(self):
+        """Decide, once its first word is complete, whether the line after a blank line is prose; None until then."""
+        match = re.match(r"\s*(\S+)(\s|$)" if self.finished else r"\s*(\S+)\s", self.text[self.blank_line:])
+        if match is None:
+            return False if self.finished else None
+        word = match.group(1).lower().rstrip(":,")
+        # Contractions such as "Here's" start prose too
+        return word not in SQL_WORDS and re.fullmatch(r"[a-z]+(['’][a-z]+)?", word) is not None
+
+    def finish(self):
+        """Mark the reply as complete and scan what is left; the query ends with it unless an end was found before."""
+        self.finished = True
+        if self.start is None and not self._find_start():
+            # No line starts a query, so it may begin in the middle of one, as in "Sure! SELECT ..."
+            select = self.text.lower().find("select")
+            if select != -1:
+                self._begin(select)
+        if self.end is None:
+            self._scan()
+        if self.end is None:
+            self.end = len(self.text)
+
+    @property
+    def reply(self):
+        """The reply from the start of the query to its end, or all of it before the query starts."""
+        return self.text[self.start or 0:self.end]
+
+    @property
+    def sql(self):
+        """The part of the query received so far, or an empty string before it starts."""
+        if self.start is None:
+            return ""
+        return self.reply.replace("`", "").strip()
+
+
+def cut_reply(content):
+    """Drop whatever follows the SQL query in a complete reply."""
+    stream = SqlStream()
+    stream.feed(content)
+    stream.finish()
+    return stream.reply
+
+
+def stream_text(response):
+    """Yield the text of each chunk of a streamed chat completion."""
+    for chunk in response:
+        if chunk.choices:
+            yield chunk.choices[0].delta.content or ""
+
+
+def stream_sql(response, extract):
+    """Show the SQL of a streamed reply while it arrives and return the final query.
+
+    `extract` turns the reply into the query, as for replies that were not streamed.
+    The stream is closed as soon as the query is complete, so the model stops
+    generating the explanation that often follows it. It is also closed if the
+    script is stopped halfway.
+    """
+    placeholder = st.empty()
+    stream = SqlStream()
+    try:
+        for chunk in stream_text(response):
+            stream.feed(chunk)
+            if stream.sql:
+                placeholder.code(stream.sql, language='sql')
+            if stream.complete:
+                break
+    finally:
+        response.close()
+    placeholder.empty()
+    return extract(stream.reply)
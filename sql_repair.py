@@ -0,0 +1,68 @@
+import duckdb
+import streamlit as st
+
+from db_connection import get_cursor
+from schema_catalog import get_schema_catalog
+from sql_cache import get_sql_cache
+
+
+def validate_sql(sql_query):
+    """Bind the query with EXPLAIN, which plans it without reading any data.
+
+    Returns the error message if the query does not parse or refers to
+    tables or columns that do not exist, otherwise None.
+    """
+    try:
+        get_cursor().execute(f"EXPLAIN {sql_query}")
+    except duckdb.Error as e:
+        # The position marker points into the EXPLAIN statement, not the query the model wrote
+        return str(e).split("\n\nLINE ")[0]
+    return None
+
+
+def repair_request(request, sql_query, error):
+    """Extend a SQL generation request with the failed query, its error and the schema of the tables involved."""
+    catalog = get_schema_catalog()
+    tables = catalog.mentioned_tables(f"{sql_query}\n{error}")
+    schema = catalog.subset_prompt(tables) if tables else catalog.schema_prompt
+    repair_prompt = f"""The SQL query fails on the DuckDB database with this error:
+{error}
+
+Schema of the tables involved:
+{schema}
+
+Generate the corrected SQL query. Do not include any non SQL related characters."""
+    messages = request["messages"] + [
+        {"role": "assistant", "content": sql_query},
+        {"role": "user", "content": repair_prompt},
+    ]
+    return dict(request, messages=messages)
+
+
+def check_repair(model, strategy, repaired_sql):
+    """Validate a repaired query, record the outcome and report the retries saved so far."""
+    succeeded = validate_sql(repaired_sql) is None
+    cache = get_sql_cache()
+    cache.record_repair(model, strategy, succeeded)
+    stats = cache.repair_stats()
+    if succeeded:
+        st.caption(f"SQL query repaired automatically. Repairs have saved {stats['succeeded']} manual "
+                   f"retries so far ({stats['succeeded']} of {stats['attempted']} succeeded).")
+    else:
+        st.caption("The repaired SQL query does not bind either.")
+    return succeeded
+
+
+def repair_sql(model, strategy, request, sql_query, generate):
+    """Return SQL that binds against the database, giving the model one chance to fix it if it does not.
+
+    `request` is the request the SQL was generated with and `generate(request)`
+    sends a request and returns the SQL of the reply.
+    """
+    error = validate_sql(sql_query)
+    if error is None:
+        return sql_query
+    st.caption(f"The generated SQL query does not bind, asking the model to fix it: {error}")
+    repaired_sql = generate(repair_request(request, sql_query, error))
+    check_repair(model, strategy, repaired_sql)
+    return repaired_sql
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import streamlit as st
+
+from llm_client import get_client
+from prompt_saver import get_history
+
+# Summaries generated at the same time across all sessions
+SUMMARY_WORKERS = 4
+
+# Number of finished or running summaries kept, so the same result is never summarized twice
+SUMMARY_CACHE_ENTRIES = 256
+
+# Seconds between updates of the status line of a summary that is still being generated
+SUMMARY_POLL_SECONDS = 1
+
+
+def _summarize(provider, api_key, request):
+    response = get_client(provider, api_key).chat.completions.create(**request)
+    return response.choices[0].message.content.strip()
+
+
+class SummaryJobs:
+    """Background summaries, keyed by the request they were generated from.
+
+    The request embeds the digest of the result, so the key acts as a
+    fingerprint of the result and the model. Failed summaries are forgotten,
+    so they are tried again the next time.
+    """
+
+    def __init__(self, max_entries=SUMMARY_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="summary")
+        self.futures = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            return self.futures.get(key)
+
+    def submit(self, key, provider, api_key, request):
+        """Start summarizing unless the same request is already done or running; return its future."""
+        with self.lock:
+            future = self.futures.get(key)
+            if future is not None and not (future.done() and future.exception() is not None):
+                self.futures.move_to_end(key)
+                return future
+            future = self.executor.submit(_summarize, provider, api_key, request)
+            self.futures[key] = future
+            while len(self.futures) > self.max_entries:
+                self.futures.popitem(last=False)
+            return future
+
+
+@st.cache_resource
+def get_summary_jobs():
+    """Create the background summary workers once per process."""
+    return SummaryJobs()
+
+
+def summaries_enabled(model, default):
+    """Tell whether results of a model's page are summarized, as chosen in the sidebar."""
+    return st.session_state.get(f"summarize_{model}", default)
+
+
+def summary_settings_sidebar(model, default):
+    st.sidebar.checkbox("Summarize results", value=default, key=f"summarize_{model}")
+
+
+def start_summary(provider, api_key, request, prompt_id=None):
+    """Start summarizing a result in the background and return the key to show it with.
+
+    Once the summary is ready it is also stored with the saved prompt, if any.
+    """
+    key = hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    future = get_summary_jobs().submit(key, provider, api_key, request)
+    if prompt_id is not None:
+        # The history is looked up here, on the script thread, and only used by the worker
+        history = get_history()
+        future.add_done_callback(
+            lambda done: history.set_summary(prompt_id, done.result()) if done.exception() is None else None)
+    return key
+
+
+def summary_panel(key):
+    """Show a background summary, waiting for it below the results while it is generated.
+
+    The wait ends as soon as the summary is ready, so nothing is sent to the
+    page after that. Any rerun of the page stops the wait at the next status
+    update, as with a running query.
+    """
+    future = get_summary_jobs().get(key)
+    if future is None:
+        st.caption("The summary is no longer available.")
+        return
+    status = st.empty()
+    start = time.perf_counter()
+    while not future.done():
+        status.caption(f"Generating summary... {time.perf_counter() - start:.0f} s")
+        wait([future], timeout=SUMMARY_POLL_SECONDS)
+    status.empty()
+    if future.exception() is not None:
+        st.error(f"The summary could not be generated: {future.exception()}")
+    else:
+        st.write(future.result())
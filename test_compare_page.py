@@ -0,0 +1,30 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from compare_page import result_signature
+
+
+def signature(rows):
+    return result_signature(pd.DataFrame(rows, columns=["journal", "total"], dtype=object))
+
+
+def test_numbers_of_different_types_match():
+    expected = signature([["MISQ", 23], ["ISR", 0.5]])
+    assert signature([["MISQ", 23.0], ["ISR", 0.5000000001]]) == expected
+    assert signature([["ISR", Decimal("0.50")], ["MISQ", Decimal("23")]]) == expected
+    assert signature([["MISQ", np.int64(23)], ["ISR", np.float32(0.5)]]) == expected
+
+
+def test_nulls_of_different_kinds_match():
+    expected = signature([["MISQ", None]])
+    assert signature([["MISQ", float("nan")]]) == expected
+    assert signature([["MISQ", pd.NA]]) == expected
+    assert signature([["MISQ", 0]]) != expected
+
+
+def test_truncated_result_has_no_signature():
+    result = pd.DataFrame({"total": [1]})
+    result.attrs["truncated"] = "rows"
+    assert result_signature(result) is None
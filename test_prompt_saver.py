@@ -0,0 +1,22 @@
+import pandas as pd
+import pyarrow.parquet as pq
+
+from prompt_saver import spill_results
+
+
+def test_duplicate_column_names_are_numbered(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    results = pd.DataFrame([[1, 1, "A paper"], [2, 2, "Another paper"]], columns=["article_id", "article_id", "title"])
+    record = spill_results(results)
+    stored = pq.read_table(record["results_file"]).to_pandas()
+    assert list(stored.columns) == ["article_id", "article_id_1", "title"]
+    assert record["row_count"] == 2
+    # The result shown on the page keeps its own column names
+    assert list(results.columns) == ["article_id", "article_id", "title"]
+
+
+def test_numbered_names_do_not_collide_with_existing_columns(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    results = pd.DataFrame([[1, 2, 3]], columns=["id", "id_1", "id"])
+    stored = pq.read_table(spill_results(results)["results_file"])
+    assert stored.column_names == ["id", "id_1", "id_2"]
@@ -0,0 +1,15 @@
+import duckdb
+
+import db_connection
+from result_cache import execute_sql
+
+
+def test_join_with_repeated_column_names(tmp_path, monkeypatch):
+    database_file = str(tmp_path / "papers.duckdb")
+    with duckdb.connect(database_file) as connection:
+        connection.execute("CREATE TABLE papers AS SELECT 1 AS article_id, 'A paper' AS title")
+        connection.execute("CREATE TABLE scores AS SELECT 1 AS article_id, 0.5 AS score")
+    monkeypatch.setattr(db_connection, "DATABASE_FILE", database_file)
+    result = execute_sql("SELECT * FROM papers p JOIN scores s ON p.article_id = s.article_id")
+    assert list(result.columns) == ["article_id", "title", "article_id_1", "score"]
+    assert not result.attrs["truncated"]
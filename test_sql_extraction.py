@@ -0,0 +1,90 @@
+from sql_extraction import SqlStream, cut_reply, extract_gpt_sql, extract_llama_sql
+
+
+def stream_in_chunks(content, size):
+    stream = SqlStream()
+    for i in range(0, len(content), size):
+        stream.feed(content[i:i + size])
+    stream.finish()
+    return stream
+
+
+def test_semicolon_in_string_literal_does_not_end_query():
+    assert cut_reply("SELECT 'a;b', 'it''s' FROM t; trailing") == "SELECT 'a;b', 'it''s' FROM t"
+
+
+def test_semicolon_in_quoted_identifier_does_not_end_query():
+    assert cut_reply('SELECT "a;b" FROM t') == 'SELECT "a;b" FROM t'
+    assert cut_reply('SELECT "a;b" FROM t;\nDone.') == 'SELECT "a;b" FROM t'
+
+
+def test_prose_with_apostrophe_after_blank_line_is_cut():
+    content = "SELECT title FROM papers\n\nHere's how it works: the query reads every paper."
+    assert cut_reply(content).strip() == "SELECT title FROM papers"
+    assert cut_reply("SELECT 1\n\nLet's also count them.").strip() == "SELECT 1"
+
+
+def test_sql_after_blank_line_is_kept():
+    content = "SELECT title\nFROM papers\n\nWHERE year > 2020\n\n'x' IS NOT NULL"
+    assert cut_reply(content) == content
+
+
+def test_query_starts_after_opening_fence():
+    content = "To select papers, use:\n\n```sql\nSELECT title FROM papers\n```\nThis selects all titles."
+    assert cut_reply(content).strip() == "SELECT title FROM papers"
+
+
+def test_query_in_fence_without_preamble():
+    assert cut_reply("```sql\nSELECT 1\n```").strip() == "SELECT 1"
+
+
+def test_final_semicolon_is_found():
+    assert cut_reply("SELECT 1;") == "SELECT 1"
+    assert extract_llama_sql(cut_reply("SELECT title FROM papers;")) == "SELECT title FROM papers"
+
+
+def test_streamed_chunks_end_where_the_whole_reply_ends():
+    contents = [
+        "To select papers, use:\n\n```sql\nSELECT \"a;b\" FROM papers\n```\nMore text.",
+        "SELECT title FROM papers\n\nHere's why.",
+        "Sure! SELECT 'x;y' FROM t;",
+    ]
+    for content in contents:
+        for size in (1, 2, 3, 7):
+            assert stream_in_chunks(content, size).reply == cut_reply(content)
+
+
+def test_stream_completes_before_the_reply_ends():
+    stream = SqlStream()
+    stream.feed("SELECT 1; and then some explanation")
+    assert stream.complete
+    assert stream.sql == "SELECT 1"
+
+
+def test_unfenced_query_with_common_table_expression_keeps_its_start():
+    content = "Here is the query:\n\nWITH counts AS (\n  SELECT journal, COUNT(*) AS n FROM papers GROUP BY journal\n)\nSELECT * FROM counts;"
+    expected = content[content.index("WITH"):content.index(";")]
+    assert cut_reply(content) == expected
+    for size in (1, 3, 7):
+        assert stream_in_chunks(content, size).reply == expected
+    assert extract_llama_sql(cut_reply(content)).startswith("WITH counts AS (")
+    assert extract_gpt_sql(cut_reply(content)).startswith("WITH counts AS (")
+
+
+def test_comments_are_skipped():
+    content = "SELECT title -- the paper's title; not its id\nFROM papers /* it's; here */ WHERE year > 2020;\nDone."
+    assert cut_reply(content) == content[:content.index("2020") + 4]
+    content = "SELECT title\nFROM papers\n\n-- Here's the filter\nWHERE year > 2020"
+    assert cut_reply(content) == content
+    for size in (1, 2, 5):
+        assert stream_in_chunks(content, size).reply == content
+
+
+def test_line_comments_do_not_swallow_the_query_when_lines_are_joined():
+    sql_query = extract_gpt_sql("SELECT title -- the title\nFROM papers WHERE title <> '--'")
+    assert sql_query.split() == ["SELECT", "title", "FROM", "papers", "WHERE", "title", "<>", "'--'"]
+
+
+def test_blank_line_after_a_comma_continues_the_query():
+    content = "SELECT title,\n\n  abstract\nFROM papers\n\nHere's why."
+    assert cut_reply(content).strip() == "SELECT title,\n\n  abstract\nFROM papers"